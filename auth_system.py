@@ -639,6 +639,11 @@ def check_auth():
         auth_ui()
         return False
 
+# Check if the logged-in user has the admin role
+def is_admin():
+    user = st.session_state.get("user")
+    return bool(user) and user.get("role") == "admin"
+
 # Include JavaScript for handling tab close events
 def include_session_timeout_js():
     # JavaScript to handle page visibility change and tab close
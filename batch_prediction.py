@@ -0,0 +1,261 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from model_registry import get_model
+
+# ---- INPUT / OUTPUT SCHEMA ----
+DISASTER_TYPES = ["Flood", "Storm", "Earthquake", "Drought"]
+
+# Same fields as the widgets on the Supply Prediction page
+INPUT_COLUMNS = [
+    "Severity",
+    "Area Size (sq km)",
+    "Gender Ratio",
+    "Duration (days)",
+    "Disaster Type",
+    "Age 0-12",
+    "Age 12-60",
+    "Age 60+",
+]
+
+FOOD_WATER_OUTPUTS = ["Rice (kg)", "Vegetables (kg)", "Dry Food (kg)", "Water (liters)"]
+SUPPLY_OUTPUTS = ["Baby Food (kg)", "Elder Medicine (units)", "Sanitary Items (units)", "Clothing Sets"]
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+# Counts and levels that must be whole numbers
+WHOLE_NUMBER_COLUMNS = ["Severity", "Duration (days)", "Age 0-12", "Age 12-60", "Age 60+"]
+MAX_LISTED_ROWS = 10
+
+# (min, max) accepted per input, the same limits as the page widgets
+VALUE_BOUNDS = {
+    "Severity": (1, 5),
+    "Area Size (sq km)": (0, None),
+    "Gender Ratio": (0.1, None),
+    "Duration (days)": (1, None),
+    "Age 0-12": (0, None),
+    "Age 12-60": (0, None),
+    "Age 60+": (0, None),
+}
+
+
+def check_columns(df):
+    missing = [col for col in INPUT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+
+
+# "rows 3, 8 and 4 more" for the rows where `mask` is set (1-based data rows)
+def _row_list(df, mask):
+    rows = [str(i + 1) if isinstance(i, (int, np.integer)) else str(i) for i in df.index[mask]]
+    listed = ", ".join(rows[:MAX_LISTED_ROWS])
+    return ("row " if len(rows) == 1 else "rows ") + listed + (f" and {len(rows) - MAX_LISTED_ROWS} more" if len(rows) > MAX_LISTED_ROWS else "")
+
+
+# Reject values the model would otherwise misread: unknown disaster types
+# (all-zero dummies look like the dropped baseline type), fractional or
+# missing counts, and values outside VALUE_BOUNDS
+def check_values(df):
+    disaster_type = df["Disaster Type"].astype(str).str.strip().str.lower()
+    unknown = ~disaster_type.isin([dtype.lower() for dtype in DISASTER_TYPES]).to_numpy()
+    if unknown.any():
+        bad = sorted(set(df["Disaster Type"][unknown].astype(str)))
+        raise ValueError(f"Unknown Disaster Type {', '.join(repr(v) for v in bad)} in {_row_list(df, unknown)}; "
+                         f"expected one of {', '.join(DISASTER_TYPES)}")
+    for column in WHOLE_NUMBER_COLUMNS + ["Area Size (sq km)", "Gender Ratio"]:
+        values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64)
+        invalid = ~np.isfinite(values)
+        if column in WHOLE_NUMBER_COLUMNS:
+            invalid |= np.isfinite(values) & (values != np.round(values))
+        if invalid.any():
+            kind = "whole numbers" if column in WHOLE_NUMBER_COLUMNS else "numbers"
+            raise ValueError(f"{column} must be {kind}; check {_row_list(df, invalid)}")
+        low, high = VALUE_BOUNDS[column]
+        out_of_range = values < low if high is None else (values < low) | (values > high)
+        if out_of_range.any():
+            expected = f"at least {low:g}" if high is None else f"between {low:g} and {high:g}"
+            raise ValueError(f"{column} must be {expected}; check {_row_list(df, out_of_range)}")
+
+
+# Turn raw widget-style inputs into the model's training columns, for every row at once
+def build_model_input(df):
+    check_columns(df)
+    check_values(df)
+    age_0_12 = df["Age 0-12"].to_numpy(dtype=np.float64).astype(np.int64)
+    age_12_60 = df["Age 12-60"].to_numpy(dtype=np.float64).astype(np.int64)
+    age_60_plus = df["Age 60+"].to_numpy(dtype=np.float64).astype(np.int64)
+    gender_ratio = df["Gender Ratio"].to_numpy(dtype=np.float64)
+
+    population_affected = age_0_12 + age_12_60 + age_60_plus
+    females = np.rint((gender_ratio / (1 + gender_ratio)) * population_affected).astype(np.int64)
+
+    input_df = pd.DataFrame({
+        "Severity": df["Severity"].to_numpy(dtype=np.float64).astype(np.int64),
+        "Area Size (sq km)": df["Area Size (sq km)"].to_numpy(dtype=np.float64),
+        "Population Affected": population_affected,
+        "Duration (days)": df["Duration (days)"].to_numpy(dtype=np.float64).astype(np.int64),
+        "Age 0-12": age_0_12,
+        "Age 12-60": age_12_60,
+        "Age 60+": age_60_plus,
+        "Females": females,
+    }, index=df.index)
+
+    # One-hot encode disaster type (case-insensitive, like the notebook)
+    disaster_type = df["Disaster Type"].astype(str).str.strip().str.lower()
+    for dtype in DISASTER_TYPES:
+        input_df[f"Disaster Type_{dtype}"] = (disaster_type == dtype.lower()).to_numpy(dtype=np.int64)
+
+    return input_df
+
+
+def quantile_label(q):
+    return f"P{q * 100:g}"
+
+
+# One-hot disaster type columns are reported as a single "Disaster Type" feature
+def feature_label(feature):
+    return "Disaster Type" if feature.startswith("Disaster Type_") else feature
+
+
+# Feature attributions for a registry entry's predictions, summed per
+# feature_label: (labels, bias of shape (n_outputs,), contributions of shape
+# (n_rows, n_labels, n_outputs))
+def grouped_attributions(entry, model_input):
+    bias, contributions = entry.explain(model_input)
+    feature_labels = [feature_label(feature) for feature in entry.feature_names]
+    labels = list(dict.fromkeys(feature_labels))
+    grouping = np.zeros((len(feature_labels), len(labels)))
+    grouping[np.arange(len(feature_labels)), [labels.index(label) for label in feature_labels]] = 1
+    return labels, bias, np.einsum("rfo,fl->rlo", contributions, grouping)
+
+
+def attribution_column(item, label):
+    return f"{item} [{label}]"
+
+
+# Predict total needs over each row's duration for both models. With
+# `quantiles` or `explain` the models must be registry entries (see
+# ModelEntry): `quantiles` adds a "<item> P<q>" column per item and quantile,
+# `explain` adds "<item> [<feature>]" columns splitting each total into a
+# baseline and per-feature path contributions.
+def predict_frame(input_df, food_water_model, food_water_features, supply_model, supply_features, quantiles=None,
+                  explain=False):
+    food_water_input = input_df.reindex(columns=food_water_features, fill_value=0)
+    supply_input = input_df.reindex(columns=supply_features, fill_value=0)
+    duration = input_df["Duration (days)"].to_numpy(dtype=np.float64)[:, None]
+    models = ((food_water_model, food_water_input, FOOD_WATER_OUTPUTS),
+              (supply_model, supply_input, SUPPLY_OUTPUTS))
+
+    columns = {}
+    for model, model_input, outputs in models:
+        if not quantiles:
+            predicted = np.asarray(model.predict(model_input)) * duration
+            columns.update({item: predicted[:, i] for i, item in enumerate(outputs)})
+            continue
+        summary = model.predict_summary(model_input, quantiles) * duration[:, :, None]
+        for i, item in enumerate(outputs):
+            columns[item] = summary[:, 0, i]
+            for j, q in enumerate(quantiles):
+                columns[f"{item} {quantile_label(q)}"] = summary[:, 1 + j, i]
+
+    if explain:
+        for model, model_input, outputs in models:
+            labels, bias, contributions = grouped_attributions(model, model_input)
+            for i, item in enumerate(outputs):
+                columns[attribution_column(item, "base")] = bias[i] * duration[:, 0]
+                for j, label in enumerate(labels):
+                    columns[attribution_column(item, label)] = contributions[:, j, i] * duration[:, 0]
+    return pd.DataFrame(columns, index=input_df.index)
+
+
+# ---- CHUNKED I/O ----
+def is_parquet(name):
+    return os.path.splitext(name)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(source, name, chunk_size=DEFAULT_CHUNK_SIZE):
+    if is_parquet(name):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet input needs the 'pyarrow' package installed")
+        parquet_file = pq.ParquetFile(source)
+        # Number rows across the whole file, like read_csv's chunks, so row
+        # numbers in errors and the schedule's default zone ids are unique
+        start = 0
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            yield chunk
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+
+# Yield input rows with prediction columns appended, one chunk at a time
+def predict_chunks(chunks, food_water_model, food_water_features, supply_model, supply_features, quantiles=None,
+                   explain=False):
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        input_df = build_model_input(chunk)
+        predictions = predict_frame(input_df, food_water_model, food_water_features,
+                                    supply_model, supply_features, quantiles, explain)
+        yield pd.concat([chunk, predictions], axis=1)
+
+
+# Stream result chunks to a CSV or Parquet file, returns the number of rows written
+def write_chunks(result_chunks, path):
+    rows = 0
+    if is_parquet(path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in result_chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, "w", newline="") as f:
+            for i, chunk in enumerate(result_chunks):
+                chunk.to_csv(f, index=False, header=(i == 0))
+                rows += len(chunk)
+    return rows
+
+
+def run_batch(input_path, output_path, food_water_path="food_water_model.pkl",
+              supply_path="supply_model.pkl", chunk_size=DEFAULT_CHUNK_SIZE, quantiles=None, explain=False):
+    food_water_entry = get_model(food_water_path)
+    supply_entry = get_model(supply_path)
+    chunks = read_chunks(input_path, input_path, chunk_size)
+    results = predict_chunks(chunks, food_water_entry, food_water_entry.feature_names,
+                             supply_entry, supply_entry.feature_names, quantiles, explain)
+    return write_chunks(results, output_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predict relief supplies for every zone in a CSV/Parquet file")
+    parser.add_argument("input", help="CSV or Parquet file with the Supply Prediction input columns")
+    parser.add_argument("output", help="Where to write predictions (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--food-water-model", default="food_water_model.pkl")
+    parser.add_argument("--supply-model", default="supply_model.pkl")
+    parser.add_argument("--quantiles", type=float, nargs="*", default=[0.1, 0.5, 0.9],
+                        help="Per-tree quantiles to add as columns (none to skip)")
+    parser.add_argument("--explain", action="store_true", help="Add per-feature attribution columns")
+    args = parser.parse_args()
+
+    written = run_batch(args.input, args.output, args.food_water_model, args.supply_model, args.chunk_size,
+                        tuple(args.quantiles), args.explain)
+    print(f"Wrote predictions for {written} zones to {args.output}")
@@ -0,0 +1,42 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.forest_engine_bench import best_of
+from benchmarks.scenarios import random_model_input
+from model_registry import get_model
+
+# Latency of per-feature path attributions next to a plain predict.
+# Run from the project root:
+#   python -m benchmarks.attribution_bench food_water_model.pkl supply_model.pkl
+
+
+def bench_model(path, batch_sizes, repeat):
+    entry = get_model(path)
+    forest = entry.forest
+    start = time.perf_counter()
+    _, table = forest.leaf_contributions()
+    print(f"\n{path}: {forest.n_trees} trees, {table.shape[0]} leaves, "
+          f"{table.nbytes / 1e6:.1f} MB contribution table built in {time.perf_counter() - start:.2f}s")
+
+    for n in batch_sizes:
+        X = random_model_input(n, entry.feature_names, seed=n)
+        predicted = entry.predict(X)
+        bias, contributions = entry.explain(X)
+        max_error = np.max(np.abs(bias + contributions.sum(axis=1) - predicted) / np.maximum(np.abs(predicted), 1.0))
+        predict_s = best_of(lambda: entry.predict(X), repeat)
+        explain_s = best_of(lambda: entry.explain(X), repeat)
+        print(f"  {n:>6} rows  predict {predict_s * 1e3:9.2f} ms  explain {explain_s * 1e3:9.2f} ms  "
+              f"max rel error vs predict {max_error:.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-feature attributions against predict")
+    parser.add_argument("models", nargs="*", default=["food_water_model.pkl", "supply_model.pkl"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        bench_model(model_path, args.rows, args.repeat)
@@ -0,0 +1,66 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from data_generation import generate_to_file
+from dataset_store import convert_csv, read_columns, read_dataset
+
+# Read times of the columnar dataset store against the CSV it was built from.
+# Run from the project root:
+#   python -m benchmarks.dataset_store_bench --rows 10000000
+
+PROJECTED = ["Population Affected", "Duration (days)"]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def run(rows, workdir, workers):
+    csv_path = os.path.join(workdir, "supply.csv")
+    store_path = os.path.join(workdir, "supply.dataset")
+    generate_seconds, _ = timed(lambda: generate_to_file("medicine_clothing", rows, csv_path, workers=workers))
+    convert_seconds, manifest = timed(lambda: convert_csv(csv_path, store_path))
+    print(f"{rows} rows: generated in {generate_seconds:.1f}s, converted in {convert_seconds:.1f}s "
+          f"({len(manifest['partitions'])} partitions)")
+    print(f"  CSV {os.path.getsize(csv_path) / 1e6:.0f} MB, store {dir_size(store_path) / 1e6:.0f} MB")
+
+    cases = [
+        ("CSV, all columns", lambda: pd.read_csv(csv_path)),
+        ("CSV, 2 columns (usecols)", lambda: pd.read_csv(csv_path, usecols=PROJECTED)),
+        ("store, all columns", lambda: read_dataset(store_path)),
+        ("store, 2 columns", lambda: read_dataset(store_path, PROJECTED)),
+        # Memory-mapped arrays, summed so every page is actually read
+        ("store, 2 columns mmap + sum", lambda: [float(a.sum()) for a in read_columns(store_path, PROJECTED).values()]),
+    ]
+    baseline = None
+    for label, fn in cases:
+        seconds, _ = timed(fn)
+        baseline = baseline or seconds
+        print(f"  {label:<30} {seconds:8.2f}s  {baseline / seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark columnar dataset reads against CSV")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--workdir", help="Keep generated files here instead of a temporary directory")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dataset_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        run(args.rows, workdir, args.workers)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir)
@@ -0,0 +1,50 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.scenarios import random_model_input
+from forest_engine import compile_forest
+from model_registry import get_model
+
+# Compare the compiled forest engine with the sklearn model's predict.
+# Run from the project root:
+#   python -m benchmarks.forest_engine_bench food_water_model.pkl supply_model.pkl
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_model(path, batch_sizes, repeat):
+    entry = get_model(path)
+    start = time.perf_counter()
+    forest = compile_forest(entry.model)
+    compile_seconds = time.perf_counter() - start
+    print(f"\n{path}: {forest.n_trees} trees, {forest.n_nodes} nodes, "
+          f"{forest.nbytes / 1e6:.1f} MB compiled in {compile_seconds:.2f}s")
+
+    for n in batch_sizes:
+        X = random_model_input(n, entry.feature_names, seed=n)
+        expected = entry.model.predict(X)
+        max_error = np.max(np.abs(forest.predict(X) - expected) / np.maximum(np.abs(expected), 1.0))
+        sklearn_s = best_of(lambda: entry.model.predict(X), repeat)
+        engine_s = best_of(lambda: forest.predict(X), repeat)
+        print(f"  {n:>6} rows  sklearn {sklearn_s * 1e3:9.2f} ms  engine {engine_s * 1e3:9.2f} ms  "
+              f"speedup {sklearn_s / engine_s:6.2f}x  max rel error {max_error:.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compiled forest engine against sklearn")
+    parser.add_argument("models", nargs="*", default=["food_water_model.pkl", "supply_model.pkl"])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 10_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for model_path in args.models:
+        bench_model(model_path, args.rows, args.repeat)
@@ -0,0 +1,67 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.scenarios import random_model_input
+from model_registry import get_model
+from prediction_service import MicroBatcher
+
+# Load generator for the prediction service: N concurrent "sessions" each
+# send single-row requests, either predicting inline in their own thread (the
+# old page behaviour) or through the micro-batching service.
+# Run from the project root:
+#   python -m benchmarks.prediction_load supply_model.pkl --sessions 1 8 32
+
+
+def run_sessions(predict, rows, sessions, requests_per_session):
+    latencies = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(i):
+        barrier.wait()
+        for j in range(requests_per_session):
+            X = rows[(i * requests_per_session + j) % len(rows)][None, :]
+            start = time.perf_counter()
+            predict(X)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.asarray(lat) for lat in latencies]) * 1e3
+    return {
+        "throughput": len(all_latencies) / elapsed,
+        "p50_ms": np.percentile(all_latencies, 50),
+        "p99_ms": np.percentile(all_latencies, 99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prediction throughput and latency under concurrent sessions")
+    parser.add_argument("model", nargs="?", default="supply_model.pkl")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=50, help="Requests per session")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    entry = get_model(args.model)
+    forest = entry.forest
+    rows = random_model_input(1000, entry.feature_names).to_numpy(dtype=np.float64)
+    batcher = MicroBatcher(forest.predict, window_ms=args.window_ms)
+
+    print(f"{'sessions':>8} {'mode':>8} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for sessions in args.sessions:
+        for mode, predict in (("inline", forest.predict), ("batched", batcher.predict)):
+            result = run_sessions(predict, rows, sessions, args.requests)
+            print(f"{sessions:>8} {mode:>8} {result['throughput']:>10.1f} "
+                  f"{result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f}")
+    print(f"batcher: {batcher.stats()}")
+    batcher.close()
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from batch_prediction import DISASTER_TYPES, build_model_input
+
+
+# Random widget-style scenarios inside the synthetic training ranges
+def random_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    population = rng.integers(100, 50000, n)
+    children = (population * rng.uniform(0.1, 0.3, n)).astype(np.int64)
+    adults = (population * rng.uniform(0.5, 0.7, n)).astype(np.int64)
+    return pd.DataFrame({
+        "Severity": rng.integers(1, 6, n),
+        "Area Size (sq km)": rng.integers(10, 5000, n).astype(np.float64),
+        "Gender Ratio": rng.uniform(0.8, 1.2, n),
+        "Duration (days)": rng.integers(1, 30, n),
+        "Disaster Type": rng.choice(DISASTER_TYPES, n),
+        "Age 0-12": children,
+        "Age 12-60": adults,
+        "Age 60+": population - children - adults,
+    })
+
+
+def random_model_input(n, feature_names, seed=0):
+    return build_model_input(random_scenarios(n, seed)).reindex(columns=feature_names, fill_value=0)
@@ -0,0 +1,132 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_prediction import write_chunks
+
+# Vectorized versions of the notebook's synthetic dataset generators.
+#
+# Each field is drawn for a whole column at once from a NumPy Generator, with
+# the same distributions and supply formulas as the notebook's row-by-row
+# loops (the random stream differs, so rows are not identical to the bundled
+# CSVs). Large datasets are produced in chunks, each with its own seed
+# spawned from the base seed, so output is identical for any worker count.
+
+# Constants for food and water supply
+RICE_PER_PERSON_PER_DAY = 0.4  # kg
+VEGETABLES_PER_PERSON_PER_DAY = 0.2  # kg
+DRY_FOOD_PER_PERSON_PER_DAY = 0.15  # kg
+WATER_PER_PERSON_PER_DAY = 3.785  # liters (1 gallon)
+
+DISASTER_TYPES = ["Flood", "Storm", "Earthquake", "Drought"]
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+# Columns shared by both datasets
+def _disaster_columns(rng, n):
+    return {
+        "Disaster Type": pd.Categorical.from_codes(rng.integers(0, len(DISASTER_TYPES), n), DISASTER_TYPES),
+        "Severity": rng.integers(1, 6, n),  # Scale 1-5
+        "Area Size (sq km)": rng.integers(10, 5000, n),
+        "Population Affected": rng.integers(100, 50000, n),
+        "Duration (days)": rng.integers(1, 30, n),
+    }
+
+
+def generate_food_water_data(num_samples=1000, seed=42):
+    rng = np.random.default_rng(seed)
+    n = num_samples
+    data = _disaster_columns(rng, n)
+    person_days = data["Population Affected"] * data["Duration (days)"]
+
+    data["Rice Supply (kg)"] = person_days * rng.uniform(0.9, 1.1, n) * RICE_PER_PERSON_PER_DAY
+    data["Vegetables Supply (kg)"] = person_days * rng.uniform(0.9, 1.1, n) * VEGETABLES_PER_PERSON_PER_DAY
+    data["Dry Food Supply (kg)"] = person_days * rng.uniform(0.9, 1.1, n) * DRY_FOOD_PER_PERSON_PER_DAY
+    data["Water Supply (liters)"] = person_days * rng.uniform(0.9, 1.1, n) * WATER_PER_PERSON_PER_DAY
+    return pd.DataFrame(data)
+
+
+def generate_medicine_clothing_data(num_samples=1000, seed=42):
+    rng = np.random.default_rng(seed)
+    n = num_samples
+    data = _disaster_columns(rng, n)
+    population = data["Population Affected"]
+    duration = data["Duration (days)"]
+
+    # Age and gender distribution
+    age_0_12 = rng.uniform(0.1, 0.3, n) * population
+    age_12_60 = rng.uniform(0.5, 0.7, n) * population
+    age_60_plus = population - (age_0_12 + age_12_60)
+    females = rng.uniform(0.45, 0.55, n) * population
+
+    data["Age 0-12"] = age_0_12
+    data["Age 12-60"] = age_12_60
+    data["Age 60+"] = age_60_plus
+    data["Females"] = females
+
+    # Calculate supplies
+    data["Baby Food (kg)"] = np.minimum(age_0_12 * duration * rng.uniform(0.9, 1.1, n) * 0.2, 5000)
+    data["Elder Medicine (units)"] = np.minimum(age_60_plus * duration * rng.uniform(0.9, 1.1, n), 10000)
+    data["Sanitary Items (units)"] = np.minimum(females * duration * rng.uniform(0.9, 1.1, n) * 0.5, 8000)
+    data["Clothing Supply (sets)"] = np.minimum(population * rng.uniform(0.2, 0.5, n), 5000)
+    return pd.DataFrame(data)
+
+
+GENERATORS = {
+    "food_water": generate_food_water_data,
+    "medicine_clothing": generate_medicine_clothing_data,
+}
+
+
+# (rows, seed) per chunk; seeds are spawned so chunks are independent streams
+def plan_chunks(num_samples, chunk_size, seed):
+    sizes = [min(chunk_size, num_samples - start) for start in range(0, num_samples, chunk_size)]
+    return list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+
+def _generate_chunk(kind, size, seed_sequence):
+    return GENERATORS[kind](size, np.random.default_rng(seed_sequence))
+
+
+# Yield chunks in order. With workers > 1 at most 2 chunks per worker are in
+# flight, so memory stays bounded however many rows are requested.
+def generate_chunks(kind, num_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, workers=1):
+    chunks = plan_chunks(num_samples, chunk_size, seed)
+    if workers <= 1:
+        for size, seed_sequence in chunks:
+            yield _generate_chunk(kind, size, seed_sequence)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for size, seed_sequence in chunks:
+            pending.append(executor.submit(_generate_chunk, kind, size, seed_sequence))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Write a dataset as CSV or Parquet (by extension), returns rows written
+def generate_to_file(kind, num_samples, path, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, workers=1):
+    return write_chunks(generate_chunks(kind, num_samples, chunk_size, seed, workers), path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic disaster supply datasets")
+    parser.add_argument("kind", choices=GENERATORS)
+    parser.add_argument("rows", type=int)
+    parser.add_argument("output", help="Output file (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate_to_file(args.kind, args.rows, args.output, args.chunk_size, args.seed, args.workers)
+    print(f"Wrote {written} rows to {args.output} in {time.perf_counter() - start:.1f}s")
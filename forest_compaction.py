@@ -0,0 +1,175 @@
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from forest_engine import CompiledForest, compile_forest
+from model_registry import estimate_nbytes
+from training import MODELS, load_dataset, split_dataset
+
+# Shrinks a trained supply model for serving: keep a subset of trees, cap the
+# depth (nodes at the cap become leaves predicting their node mean) and store
+# thresholds/values as float32. Candidates are scored on the training split's
+# held-out rows and rejected if accuracy drops past the allowed threshold.
+
+TREE_FRACTIONS = [1.0, 0.75, 0.5, 0.35, 0.25, 0.15, 0.1, 0.05]
+DEPTH_CAPS = [None, 30, 20, 16, 12, 10, 8]
+
+
+# Depth of every node reachable from `roots`, -1 for the rest
+def node_depths(forest, roots):
+    depth = np.full(forest.n_nodes, -1, dtype=np.int32)
+    frontier = np.asarray(roots)
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        internal = frontier[forest.left[frontier] != frontier]
+        frontier = np.concatenate([forest.left[internal], forest.right[internal]])
+        level += 1
+    return depth
+
+
+# New forest with the first `trees_per_group` trees of each output group,
+# truncated at `max_depth` and stored with `dtype` thresholds/values
+def compact_forest(forest, trees_per_group=None, max_depth=None, dtype=np.float32):
+    tree_ids = np.concatenate([
+        np.arange(start, end if trees_per_group is None else min(end, start + trees_per_group))
+        for start, end, _, _ in forest.output_groups()
+    ])
+    roots = forest.roots[tree_ids]
+
+    depth = node_depths(forest, roots)
+    keep = depth >= 0
+    if max_depth is not None:
+        keep &= depth <= max_depth
+    new_index = np.cumsum(keep) - 1
+    kept = np.flatnonzero(keep)
+
+    becomes_leaf = forest.left[kept] == kept
+    if max_depth is not None:
+        becomes_leaf |= depth[kept] == max_depth
+    own_index = np.arange(len(kept))
+
+    threshold = forest.threshold[kept]
+    if dtype == np.float32:
+        # Round thresholds down so `x <= t` gives the same answer for every float32 x
+        threshold32 = threshold.astype(np.float32)
+        too_high = threshold32.astype(np.float64) > threshold
+        threshold32[too_high] = np.nextafter(threshold32[too_high], np.float32(-np.inf))
+        threshold = threshold32
+
+    return CompiledForest(
+        feature=np.where(becomes_leaf, 0, forest.feature[kept]).astype(np.int32),
+        threshold=threshold,
+        left=np.where(becomes_leaf, own_index, new_index[forest.left[kept]]).astype(np.int32),
+        right=np.where(becomes_leaf, own_index, new_index[forest.right[kept]]).astype(np.int32),
+        value=forest.value[kept].astype(dtype),
+        roots=new_index[roots].astype(np.int32),
+        tree_output=forest.tree_output[tree_ids],
+        n_outputs=forest.n_outputs,
+        n_features=forest.n_features,
+    )
+
+
+def single_row_latency(forest, X, repeat=5):
+    row = X[:1]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        forest.predict(row)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def score(forest, X_test, y_test):
+    y_pred = forest.predict(X_test)
+    return r2_score(y_test, y_pred), mean_absolute_error(y_test, y_pred)
+
+
+# Try every tree-count / depth-cap combination and pick the most accurate one
+# that fits the budget. Raises ValueError if none keeps accuracy within bounds.
+def search_compaction(forest, X_test, y_test, max_size_mb=None, max_latency_ms=None,
+                      max_r2_drop=0.01, max_mae_increase=0.05):
+    base_r2, base_mae = score(forest, X_test, y_test)
+    trees_per_group = max(end - start for start, end, _, _ in forest.output_groups())
+
+    candidates = []
+    for fraction in TREE_FRACTIONS:
+        n_trees = max(1, int(round(trees_per_group * fraction)))
+        for depth_cap in DEPTH_CAPS:
+            compact = compact_forest(forest, n_trees, depth_cap)
+            size_mb = compact.nbytes / (1024 * 1024)
+            if max_size_mb is not None and size_mb > max_size_mb:
+                continue
+            latency_ms = single_row_latency(compact, X_test) * 1e3
+            if max_latency_ms is not None and latency_ms > max_latency_ms:
+                continue
+            r2, mae = score(compact, X_test, y_test)
+            candidates.append({
+                "trees_per_output": n_trees, "max_depth": depth_cap, "size_mb": size_mb,
+                "latency_ms": latency_ms, "r2": r2, "mae": mae, "forest": compact,
+            })
+
+    accepted = [c for c in candidates
+                if base_r2 - c["r2"] <= max_r2_drop and c["mae"] <= base_mae * (1 + max_mae_increase)]
+    baseline = {"r2": base_r2, "mae": base_mae}
+    if not accepted:
+        raise ValueError(f"No compaction within budget keeps R² drop <= {max_r2_drop} and MAE increase "
+                         f"<= {max_mae_increase:.0%} (baseline R² {base_r2:.4f}, MAE {base_mae:.2f}; "
+                         f"{len(candidates)} candidates fit the budget)")
+    best = max(accepted, key=lambda c: (c["r2"], -c["size_mb"]))
+    return best, baseline
+
+
+def compact_model_file(input_path, output_path, dataset, **budget):
+    with open(input_path, "rb") as f:
+        model, feature_names = pickle.load(f)
+    forest = model if isinstance(model, CompiledForest) else compile_forest(model)
+
+    X, y = load_dataset(dataset)
+    _, X_test, _, y_test = split_dataset(X, y)
+    X_test = X_test.reindex(columns=feature_names, fill_value=0)
+    best, baseline = search_compaction(forest, X_test, y_test, **budget)
+
+    with open(output_path, "wb") as f:
+        pickle.dump((best["forest"], feature_names), f)
+
+    return {
+        "trees_per_output": best["trees_per_output"],
+        "max_depth": best["max_depth"],
+        "r2_before": baseline["r2"],
+        "r2_after": best["r2"],
+        "mae_before": baseline["mae"],
+        "mae_after": best["mae"],
+        "file_mb_before": os.path.getsize(input_path) / (1024 * 1024),
+        "file_mb_after": os.path.getsize(output_path) / (1024 * 1024),
+        "memory_mb_before": estimate_nbytes(model) / (1024 * 1024),
+        "memory_mb_compiled": forest.nbytes / (1024 * 1024),
+        "memory_mb_after": best["forest"].nbytes / (1024 * 1024),
+        "latency_ms_before": single_row_latency(forest, X_test) * 1e3,
+        "latency_ms_after": best["latency_ms"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact a trained supply model to a size or latency budget")
+    parser.add_argument("input", help="Pickled (model, feature_names) to compact")
+    parser.add_argument("output", help="Where to write the compacted pickle")
+    parser.add_argument("--dataset", choices=MODELS, required=True, help="Which training dataset to score on")
+    parser.add_argument("--max-size-mb", type=float)
+    parser.add_argument("--max-latency-ms", type=float, help="Single-row predict latency budget")
+    parser.add_argument("--max-r2-drop", type=float, default=0.01)
+    parser.add_argument("--max-mae-increase", type=float, default=0.05, help="Allowed relative MAE increase")
+    args = parser.parse_args()
+
+    try:
+        report = compact_model_file(args.input, args.output, args.dataset,
+                                    max_size_mb=args.max_size_mb, max_latency_ms=args.max_latency_ms,
+                                    max_r2_drop=args.max_r2_drop, max_mae_increase=args.max_mae_increase)
+    except ValueError as e:
+        raise SystemExit(f"Rejected: {e}")
+    for key, value in report.items():
+        print(f"{key:>20}: {value:.4f}" if isinstance(value, float) else f"{key:>20}: {value}")
@@ -0,0 +1,355 @@
+import numpy as np
+
+# Array-backed inference for the RandomForest supply models.
+#
+# All trees of a model are flattened into one set of contiguous node arrays
+# and a batch of rows is pushed down every tree at once with NumPy fancy
+# indexing, instead of going through sklearn's per-estimator Python loop.
+# Leaves point back to themselves, so a traversal step is a no-op for rows
+# that have already reached one.
+#
+# That level-by-level walk is fastest for a few rows. For large batches
+# (NATIVE_MIN_ROWS and up) each tree's nodes are loaded into an sklearn Tree
+# and walked in Cython, ~5x faster at 10k rows. The Tree is a private copy
+# (64 bytes a node), so it is rebuilt per traversal, one tree at a time, and
+# dropped straight away; memory-mapped forests stay shared. Without
+# scikit-learn the NumPy walk is used for every batch size.
+
+# Upper bound on (trees x rows) traversed together, keeps scratch arrays ~10 MB
+MAX_BATCH_CELLS = 1 << 20
+
+# From this many rows per traversal, trees are walked by sklearn's Cython
+# code instead (see _native_tree); below it NumPy has less call overhead
+NATIVE_MIN_ROWS = 256
+
+# Default P10/P50/P90 interval reported next to the mean
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, roots, tree_output, n_outputs, n_features):
+        self.feature = feature          # (n_nodes,) split feature, 0 for leaves
+        self.threshold = threshold      # (n_nodes,) go left when x <= threshold
+        self.left = left                # (n_nodes,) global child index, self for leaves
+        self.right = right
+        self.value = value              # (n_nodes, k) node means, k outputs per tree
+        self.roots = roots              # (n_trees,) root node of each tree
+        self.tree_output = tree_output  # (n_trees,) first output column each tree predicts
+        self.n_outputs = int(n_outputs)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in (self.feature, self.threshold, self.left, self.right,
+                                          self.value, self.roots, self.tree_output))
+
+    # Contiguous runs of trees that write the same output columns
+    def output_groups(self):
+        outputs_per_tree = self.value.shape[1]
+        starts = np.flatnonzero(np.r_[True, self.tree_output[1:] != self.tree_output[:-1]])
+        ends = np.r_[starts[1:], self.n_trees]
+        return [(int(s), int(e), int(self.tree_output[s]), outputs_per_tree) for s, e in zip(starts, ends)]
+
+    def _as_matrix(self, X):
+        # sklearn compares float32 inputs against float64 thresholds, do the same
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X.astype(np.float64)
+
+    # Depth of every tree, for rebuilding sklearn Trees; built on first use
+    def _tree_depths(self):
+        if getattr(self, "_depths", None) is None:
+            depths = np.zeros(self.n_trees, dtype=np.int64)
+            nodes, trees, level = self.roots.astype(np.int64), np.arange(self.n_trees), 0
+            while nodes.size:
+                depths[trees] = level
+                inner = self.left[nodes] != nodes
+                nodes, trees = nodes[inner], trees[inner]
+                nodes = np.concatenate([self.left[nodes], self.right[nodes]]).astype(np.int64)
+                trees = np.concatenate([trees, trees])
+                level += 1
+            self._depths = depths
+        return self._depths
+
+    # sklearn Tree for tree t, rebuilt from the node arrays. Tree copies its
+    # nodes into private memory, so these are built per traversal and never
+    # kept: a cache would undo the sharing of memory-mapped forests.
+    def _native_tree(self, t, node_dtype, tree_class):
+        start = int(self.roots[t])
+        end = int(self.roots[t + 1]) if t + 1 < self.n_trees else self.n_nodes
+        local = np.arange(end - start)
+        left, right = self.left[start:end] - start, self.right[start:end] - start
+        is_leaf = left == local
+        nodes = np.zeros(end - start, dtype=node_dtype)
+        nodes["left_child"] = np.where(is_leaf, -1, left)
+        nodes["right_child"] = np.where(is_leaf, -1, right)
+        nodes["feature"] = np.where(is_leaf, -2, self.feature[start:end])
+        nodes["threshold"] = np.where(is_leaf, -2.0, self.threshold[start:end])
+        nodes["n_node_samples"] = 1
+        nodes["weighted_n_node_samples"] = 1.0
+
+        # Compacted forests keep float32 values; Tree only takes float64
+        k = self.value.shape[1]
+        values = np.ascontiguousarray(self.value[start:end], dtype=np.float64).reshape(end - start, k, 1)
+        tree = tree_class(self.n_features, np.ones(k, dtype=np.intp), k)
+        tree.__setstate__({"max_depth": int(self._tree_depths()[t]), "node_count": end - start,
+                           "nodes": nodes, "values": values})
+        return tree
+
+    def _native_trees(self, t0, t1):
+        return [self._native_tree(t, *_sklearn_tree()) for t in range(t0, t1)]
+
+    # Leaf reached by every (tree, row) pair for trees t0..t1, shape (t1 - t0, n_rows).
+    # `trees` are prebuilt sklearn Trees for t0..t1; otherwise large batches
+    # build them one at a time.
+    def _apply(self, X, t0, t1, trees=None):
+        native = _sklearn_tree() if X.shape[0] >= NATIVE_MIN_ROWS else None
+        if trees is None and native is None:
+            return self._walk(X, self.roots[t0:t1])
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        leaves = np.empty((t1 - t0, X.shape[0]), dtype=self.roots.dtype)
+        for i, t in enumerate(range(t0, t1)):
+            tree = trees[i] if trees is not None else self._native_tree(t, *native)
+            leaves[i] = tree.apply(X32) + self.roots[t]
+        return leaves
+
+    # NumPy level-by-level traversal from the given roots, shape (n_roots, n_rows)
+    def _walk(self, X, roots):
+        n_rows = X.shape[0]
+        x_flat = X.ravel()
+        nodes = np.repeat(roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows) * self.n_features, len(roots))
+
+        active = np.flatnonzero(self.left[nodes] != nodes)
+        while active.size:
+            current = nodes[active]
+            go_left = x_flat[row_offset[active] + self.feature[current]] <= self.threshold[current]
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = nxt
+            active = active[self.left[nxt] != nxt]
+        return nodes.reshape(len(roots), n_rows)
+
+    # Split the (trees x rows) work into blocks of at most MAX_BATCH_CELLS.
+    # Big batches are walked a few trees at a time so the nodes being visited
+    # stay in cache; small batches go through all trees in one pass.
+    def _blocks(self, n_rows):
+        row_step = min(max(n_rows, 1), MAX_BATCH_CELLS)
+        tree_step = max(1, MAX_BATCH_CELLS // row_step)
+        for r in range(0, n_rows, row_step):
+            for t in range(0, self.n_trees, tree_step):
+                yield slice(r, r + row_step), t, min(t + tree_step, self.n_trees)
+
+    def apply(self, X):
+        X = self._as_matrix(X)
+        out = np.empty((self.n_trees, X.shape[0]), dtype=self.roots.dtype)
+        for rows, t0, t1 in self._blocks(X.shape[0]):
+            out[t0:t1, rows] = self._apply(X[rows], t0, t1)
+        return out
+
+    # Same result as the sklearn model's predict, shape (n_rows, n_outputs)
+    def predict(self, X):
+        X = self._as_matrix(X)
+        groups = self.output_groups()
+        out = np.zeros((X.shape[0], self.n_outputs))
+        for rows, t0, t1 in self._blocks(X.shape[0]):
+            leaf_values = self.value[self._apply(X[rows], t0, t1)]  # (trees, rows, k)
+            for start, end, column, width in groups:
+                lo, hi = max(start, t0), min(end, t1)
+                if lo < hi:
+                    out[rows, column:column + width] += leaf_values[lo - t0:hi - t0].sum(axis=0)
+        for start, end, column, width in groups:
+            out[:, column:column + width] /= end - start
+        return out
+
+    # Mean and per-tree quantiles from a single traversal, see summarize_tree_values
+    def predict_summary(self, X, quantiles=DEFAULT_QUANTILES):
+        X = self._as_matrix(X)
+        native = len(X) >= NATIVE_MIN_ROWS and _sklearn_tree() is not None
+
+        def groups():
+            if not native:
+                step = max(1, MAX_BATCH_CELLS // self.n_trees)
+                for r in range(0, len(X), step):
+                    rows = slice(r, r + step)
+                    leaf_values = self.value[self._apply(X[rows], 0, self.n_trees)]
+                    for start, end, column, _ in self.output_groups():
+                        yield rows, column, leaf_values[start:end]
+                return
+            # One output's trees at a time, each rebuilt once for all the rows
+            for start, end, column, _ in self.output_groups():
+                trees = self._native_trees(start, end)
+                step = max(1, MAX_BATCH_CELLS // (end - start))
+                for r in range(0, len(X), step):
+                    rows = slice(r, r + step)
+                    yield rows, column, self.value[self._apply(X[rows], start, end, trees)]
+
+        return summarize_tree_values(groups(), len(X), self.n_outputs, quantiles)
+
+    # Path contribution of every split feature to every leaf, built on first
+    # use: walking root to leaf, each step's change in node mean is credited
+    # to the feature split on. Returns (row of each node in the table or -1,
+    # table of shape (n_leaves, n_features, k)).
+    def leaf_contributions(self):
+        if getattr(self, "_leaf_contributions", None) is None:
+            k = self.value.shape[1]
+            leaf_row = np.full(self.n_nodes, -1, dtype=np.int64)
+            tables = []
+            n_leaves = 0
+            nodes = self.roots.astype(np.int64)
+            acc = np.zeros((len(nodes), self.n_features, k))
+            while nodes.size:
+                is_leaf = self.left[nodes] == nodes
+                leaf_row[nodes[is_leaf]] = np.arange(n_leaves, n_leaves + is_leaf.sum())
+                n_leaves += is_leaf.sum()
+                tables.append(acc[is_leaf].astype(np.float32))
+
+                parents, acc = nodes[~is_leaf], acc[~is_leaf]
+                nodes = np.concatenate([self.left[parents], self.right[parents]]).astype(np.int64)
+                acc = np.concatenate([acc, acc])
+                split = np.tile(self.feature[parents], 2)
+                acc[np.arange(len(nodes)), split] += self.value[nodes] - np.tile(self.value[parents], (2, 1))
+            self._leaf_contributions = (leaf_row, np.concatenate(tables))
+        return self._leaf_contributions
+
+    # Per-row attributions from the leaves each tree reached (see apply):
+    # (bias of shape (n_outputs,), contributions of shape (n_rows, n_features,
+    # n_outputs)); bias + contributions.sum(axis=1) equals predict(X)
+    def explain_leaves(self, leaves):
+        leaf_row, table = self.leaf_contributions()
+        n_rows = leaves.shape[1]
+        bias = np.zeros(self.n_outputs)
+        contributions = np.zeros((n_rows, self.n_features, self.n_outputs))
+        for start, end, column, width in self.output_groups():
+            bias[column:column + width] = self.value[self.roots[start:end]].mean(axis=0)
+            row_step = max(1, MAX_BATCH_CELLS // ((end - start) * self.n_features))
+            for r in range(0, n_rows, row_step):
+                rows = slice(r, r + row_step)
+                contributions[rows, :, column:column + width] = table[leaf_row[leaves[start:end, rows]]].mean(
+                    axis=0, dtype=np.float64)
+        return bias, contributions
+
+    def explain(self, X):
+        return self.explain_leaves(self.apply(X))
+
+
+_native = False
+
+
+# (NODE_DTYPE, Tree) from scikit-learn's tree internals, or None when
+# scikit-learn is not installed
+def _sklearn_tree():
+    global _native
+    if _native is False:
+        try:
+            from sklearn.tree._tree import NODE_DTYPE, Tree
+            _native = (NODE_DTYPE, Tree)
+        except ImportError:
+            _native = None
+    return _native
+
+
+# Mean and quantiles over trees, shape (n_rows, 1 + len(quantiles), n_outputs).
+# `groups` yields (row slice, first output column, per-tree values) where the
+# per-tree values have shape (n_trees, n_rows, width).
+def summarize_tree_values(groups, n_rows, n_outputs, quantiles):
+    summary = np.empty((n_rows, 1 + len(quantiles), n_outputs))
+    for rows, column, per_tree in groups:
+        width = per_tree.shape[2]
+        summary[rows, 0, column:column + width] = per_tree.mean(axis=0)
+        if len(quantiles):
+            summary[rows, 1:, column:column + width] = np.moveaxis(np.quantile(per_tree, quantiles, axis=0), 0, 1)
+    return summary
+
+
+# Same summary computed from a fitted sklearn model, one Cython predict per
+# tree. Faster than the compiled traversal for large batches.
+def sklearn_predict_summary(model, X, quantiles=DEFAULT_QUANTILES):
+    X = np.ascontiguousarray(X, dtype=np.float32)
+
+    def groups():
+        for forest, column in _forests(model):
+            per_tree = np.stack([tree.predict(X, check_input=False) for tree in forest.estimators_])
+            yield slice(None), column, per_tree.reshape(len(forest.estimators_), len(X), -1)
+
+    n_outputs = sum(forest.estimators_[0].n_outputs_ for forest, _ in _forests(model))
+    return summarize_tree_values(groups(), len(X), n_outputs, quantiles)
+
+
+# Leaf reached in every tree as global node ids of the compiled forest,
+# shape (n_trees, n_rows), using sklearn's Cython traversal
+def sklearn_apply(model, X):
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    leaves, offset = [], 0
+    for forest, _ in _forests(model):
+        for tree in forest.estimators_:
+            leaves.append(tree.apply(X, check_input=False) + offset)
+            offset += tree.tree_.node_count
+    return np.stack(leaves).astype(np.int32)
+
+
+# (forest, first output column) pairs for a RandomForestRegressor or a
+# MultiOutputRegressor wrapping one forest per target
+def _forests(model):
+    estimators = getattr(model, "estimators_", None)
+    if not estimators:
+        raise TypeError(f"Cannot compile {type(model).__name__}: not a fitted forest")
+    if hasattr(estimators[0], "tree_"):
+        return [(model, 0)]
+    forests = []
+    for column, forest in enumerate(estimators):
+        if not getattr(forest, "estimators_", None) or not hasattr(forest.estimators_[0], "tree_"):
+            raise TypeError(f"Cannot compile {type(forest).__name__} inside {type(model).__name__}")
+        forests.append((forest, column))
+    return forests
+
+
+def compile_forest(model):
+    if isinstance(model, CompiledForest):
+        return model
+    features, thresholds, lefts, rights, values = [], [], [], [], []
+    roots, tree_output = [], []
+    offset = 0
+    n_outputs = 0
+    n_features = None
+
+    for forest, column in _forests(model):
+        for tree in forest.estimators_:
+            t = tree.tree_
+            n_nodes = t.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = t.children_left == -1
+
+            features.append(np.where(is_leaf, 0, t.feature).astype(np.int32))
+            thresholds.append(t.threshold.astype(np.float64))
+            lefts.append((np.where(is_leaf, node_ids, t.children_left) + offset).astype(np.int32))
+            rights.append((np.where(is_leaf, node_ids, t.children_right) + offset).astype(np.int32))
+            values.append(t.value.reshape(n_nodes, -1).astype(np.float64))
+            roots.append(offset)
+            tree_output.append(column)
+
+            n_outputs = max(n_outputs, column + values[-1].shape[1])
+            n_features = t.n_features
+            offset += n_nodes
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        tree_output=np.asarray(tree_output, dtype=np.int32),
+        n_outputs=n_outputs,
+        n_features=n_features,
+    )
@@ -0,0 +1,210 @@
+import argparse
+import bisect
+import csv
+import re
+import threading
+import time
+
+# Offline place index for the Route Planner.
+#
+# Built from a bundled gazetteer CSV (name, kind, state, lat, lng,
+# population) of Indian states, union territories, district headquarters and
+# towns; relief camps or other local sites can be appended as rows. District
+# rows sit at their headquarters town and carry its population. Populations
+# are approximate census figures and are only used for ranking.
+#
+# Every word-start suffix of a place name ("west bengal", "bengal") is a key
+# in one sorted array, so a prefix lookup is two bisects. Typos are caught
+# with a deletion neighbourhood over the first FUZZY_PREFIX characters: each
+# key prefix and its one-character deletions are indexed, so a query within
+# one edit of a key's start is found with a handful of dict lookups instead
+# of scanning. Matches rank by kind of match (name prefix, word prefix,
+# fuzzy) and then by population; a query answers in ~0.1 ms.
+
+GAZETTEER_PATH = "data/gazetteer_india.csv"
+FUZZY_MIN_CHARS = 4
+FUZZY_PREFIX = 6
+
+# Match tiers, best first
+NAME_PREFIX, WORD_PREFIX, FUZZY = 0, 1, 2
+
+
+def normalize_name(text):
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def _deletions(text):
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+# Restricted Damerau-Levenshtein (optimal string alignment) distance
+def edit_distance(a, b):
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+class Place:
+    __slots__ = ("name", "kind", "state", "lat", "lng", "population")
+
+    def __init__(self, name, kind, state, lat, lng, population):
+        self.name = name
+        self.kind = kind
+        self.state = state
+        self.lat = lat
+        self.lng = lng
+        self.population = population
+
+    # "Kutch district", so a district reads apart from a town of the same name
+    @property
+    def full_name(self):
+        return f"{self.name} district" if self.kind == "district" else self.name
+
+    # "Puri, Odisha"; states and union territories are just their name
+    @property
+    def label(self):
+        return f"{self.full_name}, {self.state}" if self.state else self.full_name
+
+    def __repr__(self):
+        return f"Place({self.label!r}, {self.lat}, {self.lng})"
+
+
+class Gazetteer:
+    def __init__(self, places):
+        self.places = list(places)
+        entries = []
+        self._by_name = {}
+        for i, place in enumerate(self.places):
+            name = normalize_name(place.full_name)
+            # Districts are found both as "Kutch" and "Kutch district"
+            for key in {name, normalize_name(place.name)}:
+                self._by_name.setdefault(key, []).append(i)
+            words = name.split(" ")
+            for w in range(len(words)):
+                entries.append((" ".join(words[w:]), i, NAME_PREFIX if w == 0 else WORD_PREFIX))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._entries = [(i, tier) for _, i, tier in entries]
+
+        # _fuzzy[n]: the first n characters of every key and their deletions
+        self._fuzzy = {}
+        for n in range(FUZZY_MIN_CHARS - 1, FUZZY_PREFIX + 2):
+            index = self._fuzzy[n] = {}
+            for k, key in enumerate(self._keys):
+                start = key[:n]
+                for variant in _deletions(start) | {start}:
+                    index.setdefault(variant, set()).add(k)
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(Place(row["name"], row["kind"], row["state"], float(row["lat"]), float(row["lng"]),
+                             int(row["population"] or 0)) for row in csv.DictReader(f))
+
+    # {place index: best tier} of keys starting with `query`
+    def _prefix_matches(self, query, matches):
+        start = bisect.bisect_left(self._keys, query)
+        end = bisect.bisect_left(self._keys, query + "\uffff", start)
+        for i, tier in self._entries[start:end]:
+            if tier < matches.get(i, FUZZY + 1):
+                matches[i] = tier
+
+    # Keys whose start is within one edit of the query's start
+    def _fuzzy_matches(self, query, matches):
+        n = min(len(query), FUZZY_PREFIX)
+        start = query[:n]
+        candidates = set()
+        for variant in _deletions(start) | {start}:
+            candidates |= self._fuzzy[n].get(variant, set())
+        candidates |= self._fuzzy[n + 1].get(start, set())
+        for variant in _deletions(start):
+            candidates |= self._fuzzy[n - 1].get(variant, set())
+        for k in candidates:
+            i, _ = self._entries[k]
+            if i in matches:
+                continue
+            key = self._keys[k]
+            if min(edit_distance(start, key[:m]) for m in (n - 1, n, n + 1)) <= 1:
+                matches[i] = FUZZY
+
+    def _in_state(self, i, state):
+        place = self.places[i]
+        return normalize_name(place.state or place.name).startswith(state)
+
+    # Split "name, state, india" into the normalized name and state parts
+    @staticmethod
+    def _parse(text):
+        parts = [normalize_name(part) for part in text.split(",")]
+        parts = [part for part in parts if part and part != "india"]
+        return (parts[0] if parts else ""), (parts[1] if len(parts) > 1 else "")
+
+    # Up to `limit` (place, tier) pairs for partially typed `text`, best first.
+    # Fuzzy matches are only looked for when exact prefixes give too few.
+    def complete(self, text, limit=5, fuzzy=True):
+        query, state = self._parse(text)
+        if not query:
+            return []
+        matches = {}
+        self._prefix_matches(query, matches)
+        if fuzzy and len(matches) < limit and len(query) >= FUZZY_MIN_CHARS:
+            self._fuzzy_matches(query, matches)
+        ranked = sorted((tier, -self.places[i].population, i) for i, tier in matches.items()
+                        if not state or self._in_state(i, state))
+        return [(self.places[i], tier) for tier, _, i in ranked[:limit]]
+
+    # The place `text` names ("Puri", "Puri, Odisha", a complete() label), the
+    # most populous if several match. With fuzzy=True a name within one edit
+    # is accepted when nothing matches exactly.
+    def geocode(self, text, fuzzy=True):
+        query, state = self._parse(text)
+        candidates = [i for i in self._by_name.get(query, []) if not state or self._in_state(i, state)]
+        if not candidates and fuzzy and len(query) >= FUZZY_MIN_CHARS:
+            matches = {}
+            self._fuzzy_matches(query, matches)
+            candidates = [i for i in matches if (not state or self._in_state(i, state))
+                          and abs(len(self.places[i].name) - len(query)) <= 1
+                          and edit_distance(query, normalize_name(self.places[i].name)) <= 1]
+        if not candidates:
+            return None
+        return self.places[max(candidates, key=lambda i: self.places[i].population)]
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+# Process-wide index of the bundled gazetteer, built on first use
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer.from_csv()
+    return _gazetteer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the offline gazetteer")
+    parser.add_argument("query", nargs="+")
+    parser.add_argument("--path", default=GAZETTEER_PATH)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    gazetteer = Gazetteer.from_csv(args.path)
+    print(f"Indexed {len(gazetteer.places)} places in {(time.perf_counter() - start) * 1e3:.1f} ms")
+    for query in args.query:
+        start = time.perf_counter()
+        results = gazetteer.complete(query, args.limit)
+        elapsed = time.perf_counter() - start
+        print(f"\n{query!r} ({elapsed * 1e3:.3f} ms):")
+        for place, tier in results:
+            print(f"  {['name', 'word', 'fuzzy'][tier]:<5}  {place.label:<40} {place.lat:8.4f} {place.lng:8.4f}  "
+                  f"pop {place.population:,}")
+        print(f"  geocode -> {gazetteer.geocode(query)}")
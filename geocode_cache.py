@@ -0,0 +1,248 @@
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Persistent geocode cache for the Route Planner.
+#
+# One SQLite file shared by every session and server process, keyed on the
+# normalized address. Found coordinates are kept for DEFAULT_TTL_SECONDS and
+# confirmed "no result" answers for NEGATIVE_TTL_SECONDS, so a misspelt via
+# point is not re-sent on every click either. Transient failures (network,
+# quota, 5xx) are never cached. Pinned entries override Google for places it
+# resolves badly (camps, unnamed settlements) and never expire.
+#
+# WAL mode lets readers in other processes continue while one writes.
+# resolve_many() answers what it can from the cache and geocodes the rest on
+# a bounded thread pool, so a route with N stops waits about one round trip.
+
+CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
+
+# Concurrent lookups for resolve_many(), shared by all sessions in a process
+MAX_WORKERS = 8
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    address TEXT NOT NULL,
+    lat REAL,
+    lng REAL,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL
+)
+"""
+
+
+# Raised by geocoding functions for failures that must not be cached
+class GeocodeError(Exception):
+    pass
+
+
+def normalize_address(address):
+    address = re.sub(r"\s*,\s*", ", ", address.casefold())
+    return re.sub(r"\s+", " ", address).strip(" ,")
+
+
+def format_coords(lat, lng):
+    return f"{float(lat)},{float(lng)}"
+
+
+class GeocodeCache:
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL_SECONDS, negative_ttl=NEGATIVE_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    # (found, coords): found is False on a miss; coords is "lat,lng", or None
+    # for a cached negative result
+    def get(self, address):
+        key = normalize_address(address)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lng, pinned, expires_at FROM geocodes WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            lat, lng, pinned, expires_at = row
+            if not pinned and expires_at < time.time():
+                self._conn.execute("DELETE FROM geocodes WHERE key = ? AND pinned = 0", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            if lat is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, format_coords(lat, lng)
+
+    # Store a lookup result (coords=None for "no such place"). Never replaces a pin.
+    def put(self, address, coords):
+        now = time.time()
+        lat, lng = coords if coords is not None else (None, None)
+        expires_at = now + (self.ttl if coords is not None else self.negative_ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO geocodes (key, address, lat, lng, pinned, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET address = excluded.address, lat = excluded.lat, "
+                "lng = excluded.lng, created_at = excluded.created_at, expires_at = excluded.expires_at "
+                "WHERE pinned = 0",
+                (normalize_address(address), address, lat, lng, now, expires_at))
+
+    # Cached coordinates for `address`, calling geocode_fn(address) -> (lat, lng)
+    # or None on a miss. GeocodeError from geocode_fn propagates uncached.
+    def resolve(self, address, geocode_fn):
+        found, coords = self.get(address)
+        return coords if found else self._lookup(address, geocode_fn)
+
+    def _lookup(self, address, geocode_fn):
+        result = geocode_fn(address)
+        self.put(address, result)
+        return format_coords(*result) if result is not None else None
+
+    # Resolve several addresses at once; cache misses are geocoded concurrently
+    # (each distinct normalized address once). Returns (coords in input order,
+    # failures), where failures maps each unresolved address to "not found",
+    # "timed out" or the error message. Lookups still running after `timeout`
+    # seconds are reported as timed out; their results are still cached.
+    def resolve_many(self, addresses, geocode_fn, timeout=None):
+        keys = [normalize_address(address) for address in addresses]
+        distinct = {}
+        for key, address in zip(keys, addresses):
+            distinct.setdefault(key, address)
+        resolved, failed, pending = {}, {}, {}
+        for key, address in distinct.items():
+            found, coords = self.get(address)
+            if found:
+                resolved[key] = coords
+            else:
+                pending[_executor().submit(self._lookup, address, geocode_fn)] = key
+        done, not_done = wait(pending, timeout=timeout)
+        for future in done:
+            try:
+                resolved[pending[future]] = future.result()
+            except Exception as e:
+                # A bug or unexpected error in geocode_fn fails this stop, not the route
+                failed[pending[future]] = str(e) or type(e).__name__
+        for future in not_done:
+            failed[pending[future]] = "timed out"
+        for key, coords in resolved.items():
+            if coords is None:
+                failed[key] = "not found"
+        failures = {address: failed[key] for address, key in zip(addresses, keys) if key in failed}
+        return [resolved.get(key) for key in keys], failures
+
+    def pin(self, address, lat, lng):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodes (key, address, lat, lng, pinned, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, NULL)",
+                (normalize_address(address), address, float(lat), float(lng), time.time()))
+
+    # Drop a pin (and any cached result), so the next lookup goes to Google
+    def unpin(self, address):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM geocodes WHERE key = ? AND pinned = 1",
+                                        (normalize_address(address),))
+        return cursor.rowcount > 0
+
+    def pinned(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT address, lat, lng FROM geocodes WHERE pinned = 1 ORDER BY address").fetchall()
+
+    def purge_expired(self):
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM geocodes WHERE pinned = 0 AND expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM geocodes WHERE pinned = 0")
+
+    def stats(self):
+        with self._lock:
+            entries, negative, pinned = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(lat IS NULL), 0), COALESCE(SUM(pinned), 0) FROM geocodes").fetchone()
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": entries,
+            "negative_entries": negative,
+            "pinned": pinned,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _cache_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="geocode")
+    return _pool
+
+
+# Process-wide cache on CACHE_PATH, opened on first use
+def get_geocode_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeocodeCache()
+    return _cache
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and pin entries of the Route Planner geocode cache")
+    parser.add_argument("--path", default=CACHE_PATH)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pin_parser = subparsers.add_parser("pin", help="Pin an address to fixed coordinates")
+    pin_parser.add_argument("address")
+    pin_parser.add_argument("lat", type=float)
+    pin_parser.add_argument("lng", type=float)
+    unpin_parser = subparsers.add_parser("unpin", help="Remove a pinned address")
+    unpin_parser.add_argument("address")
+    subparsers.add_parser("list", help="List pinned addresses")
+    subparsers.add_parser("stats", help="Entry counts")
+    subparsers.add_parser("purge", help="Delete expired entries")
+    args = parser.parse_args()
+
+    cache = GeocodeCache(args.path)
+    if args.command == "pin":
+        cache.pin(args.address, args.lat, args.lng)
+        print(f"Pinned {args.address!r} to {format_coords(args.lat, args.lng)}")
+    elif args.command == "unpin":
+        print(f"Unpinned {args.address!r}" if cache.unpin(args.address) else f"{args.address!r} was not pinned")
+    elif args.command == "list":
+        for address, lat, lng in cache.pinned():
+            print(f"{address}\t{format_coords(lat, lng)}")
+    elif args.command == "stats":
+        stats = cache.stats()
+        print(f"{stats['entries']} entries ({stats['negative_entries']} negative, {stats['pinned']} pinned)")
+    else:
+        print(f"Deleted {cache.purge_expired()} expired entries")
@@ -0,0 +1,174 @@
+import argparse
+import io
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from training import MODELS
+
+# Incremental model updates from recorded field actuals.
+#
+# Observed consumption after a deployment is appended to a local store
+# (one CSV per model under ACTUALS_DIR). An update grows every forest in the
+# model with a few new trees fitted on the new rows plus a bounded window of
+# recent ones (sklearn warm_start), then retires the oldest trees so each
+# forest keeps a fixed size. Cost depends on the new data and the window,
+# not on the full training history.
+
+ACTUALS_DIR = "data/field_actuals"
+RECORDED_AT = "Recorded At"
+TAIL_BLOCK_BYTES = 1 << 16
+
+
+def actuals_path(name):
+    return os.path.join(ACTUALS_DIR, f"{name}.csv")
+
+
+def required_columns(name):
+    # Raw dataset columns: everything in the training CSV header
+    with open(MODELS[name]["data"]) as f:
+        return f.readline().strip().split(",")
+
+
+# Append labelled observations to the model's actuals store
+def record_actuals(name, df):
+    columns = required_columns(name)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns for {name} actuals: {', '.join(missing)}")
+
+    rows = df[columns].copy()
+    rows[RECORDED_AT] = pd.Timestamp.now().isoformat(timespec="seconds")
+    path = actuals_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rows.to_csv(path, mode="a", index=False, header=not os.path.exists(path))
+    return len(rows)
+
+
+# The last `window_rows` recorded observations. The store is read backwards
+# from its end a block at a time, so an update costs the same however long
+# the history grows (rows are single lines, as record_actuals writes them).
+def recent_actuals(name, window_rows):
+    path = actuals_path(name)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=required_columns(name))
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        position = f.seek(0, os.SEEK_END)
+        tail = b""
+        # One newline more than rows wanted, so the first line kept is whole
+        while position > data_start and tail.count(b"\n") <= window_rows:
+            step = min(TAIL_BLOCK_BYTES, position - data_start)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+    lines = [line for line in tail.splitlines() if line.strip()][-window_rows:] if window_rows > 0 else []
+    if not lines:
+        return pd.DataFrame(columns=required_columns(name))
+    return pd.read_csv(io.BytesIO(header + b"\n".join(lines) + b"\n"))
+
+
+# Encode raw rows against a trained model's exact feature columns (a plain
+# get_dummies on a small batch could drop a different disaster type)
+def encode_rows(df, feature_names):
+    X = pd.DataFrame(index=df.index)
+    disaster_type = df["Disaster Type"].astype(str).str.strip().str.lower()
+    for feature in feature_names:
+        if feature.startswith("Disaster Type_"):
+            X[feature] = (disaster_type == feature[len("Disaster Type_"):].lower()).astype(np.int64)
+        else:
+            X[feature] = df[feature]
+    return X
+
+
+# (forest, target columns) pairs for either model layout
+def _forests_with_targets(model, n_targets):
+    if hasattr(model.estimators_[0], "tree_"):
+        return [(model, list(range(n_targets)))]
+    return [(forest, [i]) for i, forest in enumerate(model.estimators_)]
+
+
+# A different seed for every update. warm_start draws the new trees' seeds
+# after skipping len(estimators_) draws, and the window keeps that length
+# fixed, so an unchanged random_state would regrow the previous update's trees.
+def _next_seed(random_state):
+    if isinstance(random_state, (int, np.integer)):
+        return (int(random_state) + 1) % 2**32
+    return random_state
+
+
+def grow_forests(model, X, y, new_trees, max_trees):
+    for forest, targets in _forests_with_targets(model, y.shape[1]):
+        target = y[:, targets[0]] if len(targets) == 1 else y[:, targets]
+        forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees,
+                          random_state=_next_seed(forest.random_state))
+        forest.fit(X, target)
+        # Sliding window over trees: drop the oldest ones
+        if len(forest.estimators_) > max_trees:
+            forest.estimators_ = forest.estimators_[-max_trees:]
+        forest.set_params(warm_start=False, n_estimators=len(forest.estimators_))
+    return model
+
+
+def update_model(name, model_path, new_rows=None, new_trees=50, window_rows=2000, max_trees=None, artifact=None):
+    start = time.perf_counter()
+    if new_rows is not None and len(new_rows):
+        record_actuals(name, new_rows)
+    window = recent_actuals(name, window_rows)
+    if window.empty:
+        raise ValueError(f"No recorded actuals for {name} in {actuals_path(name)}")
+
+    with open(model_path, "rb") as f:
+        model, feature_names = pickle.load(f)
+    feature_names = list(feature_names)
+    if max_trees is None:
+        max_trees = max(len(forest.estimators_) for forest, _ in _forests_with_targets(model, 1))
+
+    # Kept as a DataFrame so the refitted forests keep their feature names
+    X = encode_rows(window, feature_names).astype(np.float64)
+    y = window[MODELS[name]["targets"]].to_numpy(dtype=np.float64)
+    grow_forests(model, X, y, new_trees, max_trees)
+
+    # Write next to the target and rename, so the registry never sees a partial file
+    tmp_path = f"{model_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((model, feature_names), f)
+    os.replace(tmp_path, model_path)
+
+    if artifact:
+        from forest_engine import compile_forest
+        from model_artifact import save_artifact
+
+        save_artifact(compile_forest(model), feature_names, artifact, MODELS[name]["targets"],
+                      {"updated_with": "incremental_update", "window_rows": len(window)})
+
+    return {"rows_used": len(window), "new_trees": new_trees, "max_trees": max_trees,
+            "seconds": time.perf_counter() - start}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update a supply model from recorded field actuals")
+    parser.add_argument("model", choices=MODELS)
+    parser.add_argument("actuals", nargs="?", help="CSV of new observations (same columns as the training data)")
+    parser.add_argument("--model-path", help="Pickle to update (defaults to the path the app loads)")
+    parser.add_argument("--artifact", help="Also rewrite this memory-mapped artifact directory")
+    parser.add_argument("--new-trees", type=int, default=50, help="Trees added per forest")
+    parser.add_argument("--window-rows", type=int, default=2000, help="Recent observations the new trees see")
+    parser.add_argument("--max-trees", type=int, help="Trees kept per forest (defaults to the current count)")
+    parser.add_argument("--record-only", action="store_true", help="Store the actuals without updating")
+    args = parser.parse_args()
+
+    if args.record_only and not args.actuals:
+        parser.error("--record-only needs an actuals CSV")
+    new_rows = pd.read_csv(args.actuals) if args.actuals else None
+    if args.record_only:
+        print(f"Recorded {record_actuals(args.model, new_rows)} observations in {actuals_path(args.model)}")
+    else:
+        report = update_model(args.model, args.model_path or MODELS[args.model]["output"], new_rows,
+                              args.new_trees, args.window_rows, args.max_trees, args.artifact)
+        print(f"Updated with {report['rows_used']} observations: +{report['new_trees']} trees per forest "
+              f"(capped at {report['max_trees']}) in {report['seconds']:.1f}s")
@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared Google Maps web service client for the Route Planner.
+#
+# One requests.Session per process keeps TLS connections to
+# maps.googleapis.com alive across calls, sessions and the geocoding thread
+# pool. Each endpoint has its own timeout. 5xx responses and
+# OVER_QUERY_LIMIT answers are retried with exponential backoff and full
+# jitter (a random sleep up to base * 2**attempt), so workers that were
+# throttled together do not retry together; connection errors and timeouts
+# are raised at once, which keeps the offline fallbacks fast.
+#
+# Per-endpoint counters (calls, retries, errors, latency) feed the admin
+# panel.
+
+BASE_URL = "https://maps.googleapis.com/maps/api"
+ENDPOINTS = {
+    # name: (path, timeout in seconds)
+    "autocomplete": ("place/autocomplete/json", 3),
+    "geocode": ("geocode/json", 5),
+    "directions": ("directions/json", 10),
+}
+POOL_SIZE = 16
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.25
+MAX_BACKOFF_SECONDS = 4.0
+LATENCY_WINDOW = 1000
+
+RETRY_STATUSES = {"OVER_QUERY_LIMIT"}
+# JSON statuses that are answers; any other is counted as an error
+ANSWER_STATUSES = {"OK", "ZERO_RESULTS"}
+
+
+class MapsClient:
+    def __init__(self, api_key, pool_size=POOL_SIZE, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(ENDPOINTS), pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._stats = {name: {"calls": 0, "retries": 0, "errors": 0, "latencies": deque(maxlen=LATENCY_WINDOW)}
+                       for name in ENDPOINTS}
+
+    def _record(self, endpoint, key, value=1):
+        with self._lock:
+            if key == "latencies":
+                self._stats[endpoint][key].append(value)
+            else:
+                self._stats[endpoint][key] += value
+
+    def _sleep(self, attempt):
+        time.sleep(random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** attempt)))
+
+    # The endpoint's JSON answer for `params` (the key is added; an empty 2xx
+    # body is {}). Raises a requests.RequestException on network errors,
+    # timeouts and non-2xx responses left after retrying. A JSON status other
+    # than OK is the caller's to read; statuses outside ANSWER_STATUSES are
+    # also counted as errors.
+    def get(self, endpoint, params):
+        path, timeout = ENDPOINTS[endpoint]
+        params = {**params, "key": self.api_key}
+        self._record(endpoint, "calls")
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                response = self.session.get(f"{BASE_URL}/{path}", params=params, timeout=timeout)
+                last = attempt == self.max_retries
+                if 200 <= response.status_code < 300:
+                    data = response.json() if response.content else {}
+                    if last or data.get("status") not in RETRY_STATUSES:
+                        if data.get("status") not in ANSWER_STATUSES:
+                            self._record(endpoint, "errors")
+                        return data
+                elif response.status_code < 500 or last:
+                    response.raise_for_status()
+                    raise requests.HTTPError(f"Unexpected HTTP status {response.status_code}", response=response)
+                self._record(endpoint, "retries")
+                self._sleep(attempt)
+        except (requests.RequestException, ValueError):
+            self._record(endpoint, "errors")
+            raise
+        finally:
+            self._record(endpoint, "latencies", time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            rows = {}
+            for name, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                rows[name] = {
+                    "calls": stats["calls"],
+                    "retries": stats["retries"],
+                    "errors": stats["errors"],
+                    "timeout_seconds": ENDPOINTS[name][1],
+                    "p50_ms": latencies[len(latencies) // 2] * 1e3 if latencies else None,
+                    "p95_ms": latencies[int(len(latencies) * 0.95)] * 1e3 if latencies else None,
+                }
+            return rows
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# Process-wide client, created on first use
+def get_maps_client(api_key):
+    global _client
+    if _client is None or _client.api_key != api_key:
+        with _client_lock:
+            if _client is None or _client.api_key != api_key:
+                _client = MapsClient(api_key)
+    return _client
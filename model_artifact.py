@@ -0,0 +1,148 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+
+from forest_engine import CompiledForest, compile_forest
+
+# Pickle-free model artifact format.
+#
+# An artifact is a directory holding `header.json` plus one `.npy` file per
+# tree array. The header records the format version, feature and target
+# names, training metadata and a sha256 per array. Arrays are opened with
+# np.load(mmap_mode="r"), so loading is near-instant, nothing executes on
+# load, and every server process reading the same artifact shares its pages
+# through the OS page cache.
+
+FORMAT_NAME = "supply-forest"
+FORMAT_VERSION = 1
+HEADER_FILE = "header.json"
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "value", "roots", "tree_output"]
+
+
+class ArtifactError(ValueError):
+    pass
+
+
+def is_artifact(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, HEADER_FILE))
+
+
+def array_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_artifact(forest, feature_names, path, target_names=None, metadata=None):
+    # Write into a temporary directory and swap it in, so readers never see
+    # a half-written artifact
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path)
+    arrays = {}
+    for name in ARRAY_NAMES:
+        filename = f"{name}.npy"
+        array = np.ascontiguousarray(getattr(forest, name))
+        np.save(os.path.join(tmp_path, filename), array)
+        arrays[name] = {
+            "file": filename,
+            "dtype": str(array.dtype),
+            "shape": list(array.shape),
+            "sha256": array_checksum(os.path.join(tmp_path, filename)),
+        }
+
+    header = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "feature_names": [str(name) for name in feature_names],
+        "target_names": list(target_names or []),
+        "n_outputs": forest.n_outputs,
+        "n_features": forest.n_features,
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "metadata": metadata or {},
+        "arrays": arrays,
+    }
+    # Checksum of the whole artifact, used as its version
+    header["checksum"] = hashlib.sha256(
+        json.dumps(arrays, sort_keys=True).encode() + json.dumps(header["feature_names"]).encode()
+    ).hexdigest()
+    with open(os.path.join(tmp_path, HEADER_FILE), "w") as f:
+        json.dump(header, f, indent=2)
+
+    if os.path.exists(path):
+        old_path = f"{path}.old-{os.getpid()}"
+        os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        shutil.rmtree(old_path)
+    else:
+        os.rename(tmp_path, path)
+    return header
+
+
+def read_header(path):
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT_NAME:
+        raise ArtifactError(f"{path} is not a {FORMAT_NAME} artifact")
+    if header.get("format_version", 0) > FORMAT_VERSION:
+        raise ArtifactError(f"{path} uses format version {header['format_version']}, "
+                            f"this code reads up to {FORMAT_VERSION}")
+    return header
+
+
+# Returns (forest, header). With verify=True every array file is checksummed,
+# which reads it fully; by default only shapes and dtypes are checked.
+def load_artifact(path, mmap=True, verify=False):
+    header = read_header(path)
+    arrays = {}
+    for name in ARRAY_NAMES:
+        spec = header["arrays"][name]
+        array_path = os.path.join(path, spec["file"])
+        if verify and array_checksum(array_path) != spec["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {array_path}")
+        array = np.load(array_path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if str(array.dtype) != spec["dtype"] or list(array.shape) != spec["shape"]:
+            raise ArtifactError(f"{array_path} does not match its header")
+        arrays[name] = array
+
+    forest = CompiledForest(n_outputs=header["n_outputs"], n_features=header["n_features"], **arrays)
+    return forest, header
+
+
+# Convert a pickled (model, feature_names) tuple into an artifact directory
+def convert_pickle(pickle_path, artifact_path, target_names=None, metadata=None):
+    with open(pickle_path, "rb") as f:
+        model, feature_names = pickle.load(f)
+    forest = compile_forest(model)
+    metadata = dict(metadata or {})
+    metadata.setdefault("source", os.path.basename(pickle_path))
+    metadata.setdefault("source_sha256", array_checksum(pickle_path))
+    metadata.setdefault("model_type", type(model).__name__)
+    metadata.setdefault("converted_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+    if hasattr(model, "get_params"):
+        params = model.get_params()
+        metadata.setdefault("params", {k: v for k, v in params.items() if isinstance(v, (int, float, str, bool, type(None)))})
+    return save_artifact(forest, feature_names, artifact_path, target_names, metadata)
+
+
+if __name__ == "__main__":
+    from training import MODELS
+
+    parser = argparse.ArgumentParser(description="Convert pickled supply models to the memory-mapped artifact format")
+    parser.add_argument("pickle", help="Pickled (model, feature_names) tuple")
+    parser.add_argument("artifact", help="Output artifact directory (e.g. supply_model.forest)")
+    parser.add_argument("--dataset", choices=MODELS, help="Record this dataset's target names in the header")
+    args = parser.parse_args()
+
+    targets = MODELS[args.dataset]["targets"] if args.dataset else None
+    header = convert_pickle(args.pickle, args.artifact, targets)
+    print(f"Wrote {args.artifact}: {header['n_trees']} trees, {header['n_nodes']} nodes, "
+          f"checksum {header['checksum'][:12]}")
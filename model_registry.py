@@ -0,0 +1,246 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from forest_engine import DEFAULT_QUANTILES, CompiledForest, compile_forest, sklearn_apply, sklearn_predict_summary
+from model_artifact import HEADER_FILE, is_artifact, load_artifact, read_header
+from shared_models import shared_model_path
+
+# Process-wide registry for the supply models, either pickled
+# `(model, feature_names)` tuples or memory-mapped artifacts (model_artifact.py).
+#
+# Streamlit re-executes page scripts on every widget change, but imported
+# modules stay in sys.modules for the lifetime of the server process. Keeping
+# the loaded models here means each artifact is unpickled once per process and
+# every session gets the same instance back. Callers must treat that instance
+# as read-only.
+
+# How often (seconds) to stat the file again before trusting the loaded copy
+STAT_INTERVAL = 1.0
+
+# Batches up to this many rows go through the compiled forest; larger ones are
+# faster tree by tree in sklearn's Cython traversal
+ENGINE_MAX_ROWS = 64
+
+
+# Rough resident size of a loaded model, in bytes
+def estimate_nbytes(obj, _seen=None):
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(item, _seen) for item in obj)
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(item, _seen) for item in obj.values())
+
+    # sklearn decision trees keep their nodes in a Cython object
+    tree = getattr(obj, "tree_", None)
+    if tree is not None and hasattr(tree, "__getstate__"):
+        state = tree.__getstate__()
+        return state["nodes"].nbytes + state["values"].nbytes
+
+    attrs = getattr(obj, "__dict__", None)
+    if isinstance(attrs, dict):
+        return estimate_nbytes(attrs, _seen)
+    return 0
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# One loaded artifact plus the bookkeeping needed to detect changes
+class ModelEntry:
+    def __init__(self, path, model, feature_names, mtime_ns, size, checksum, load_seconds):
+        self.path = path
+        self.model = model
+        self.feature_names = feature_names
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checksum = checksum
+        self.load_seconds = load_seconds
+        # File whose mtime/size signal a change (the header for artifacts)
+        self.stat_path = os.path.join(path, HEADER_FILE) if os.path.isdir(path) else path
+        self.artifact_bytes = size
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+        self.nbytes = estimate_nbytes(model)
+        self._forest = None
+
+    # Short hash identifying this exact artifact, changes on retraining
+    @property
+    def version(self):
+        return self.checksum[:12]
+
+    # Array-backed copy of the model for low-latency predict, built on first use
+    @property
+    def forest(self):
+        if self._forest is None:
+            self._forest = compile_forest(self.model)
+        return self._forest
+
+    # Compacted artifacts only exist in compiled form; their large batches take
+    # the engine's Cython-backed path (forest_engine.NATIVE_MIN_ROWS)
+    def _use_engine(self, X):
+        return len(X) <= ENGINE_MAX_ROWS or isinstance(self.model, CompiledForest)
+
+    # Predict with whichever implementation is faster for this batch size
+    def predict(self, X):
+        if self._use_engine(X):
+            return self.forest.predict(X)
+        return sklearn_predict_summary(self.model, X, quantiles=())[:, 0]
+
+    # Mean plus per-tree quantiles, shape (n_rows, 1 + len(quantiles), n_outputs)
+    def predict_summary(self, X, quantiles=DEFAULT_QUANTILES):
+        if self._use_engine(X):
+            return self.forest.predict_summary(X, quantiles)
+        return sklearn_predict_summary(self.model, X, quantiles)
+
+    # Per-feature path attributions, see CompiledForest.explain_leaves
+    def explain(self, X):
+        if self._use_engine(X):
+            return self.forest.explain(X)
+        return self.forest.explain_leaves(sklearn_apply(self.model, X))
+
+    # Bytes built lazily from the model in this process: the compiled copy of
+    # a pickled model, and the forest's attribution table and tree depths
+    def derived_nbytes(self):
+        forest = self._forest if self._forest is not None else self.model
+        if not isinstance(forest, CompiledForest):
+            return 0
+        total = forest.nbytes if forest is not self.model else 0
+        for attr in ("_leaf_contributions", "_depths"):
+            total += estimate_nbytes(getattr(forest, attr, None))
+        return total
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "file_size_mb": self.artifact_bytes / (1024 * 1024),
+            "resident_mb": self.nbytes / (1024 * 1024),
+            "derived_mb": self.derived_nbytes() / (1024 * 1024),
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def _load_artifact(path):
+    start = time.perf_counter()
+    stat = os.stat(os.path.join(path, HEADER_FILE))
+    forest, header = load_artifact(path)
+    elapsed = time.perf_counter() - start
+    entry = ModelEntry(path, forest, header["feature_names"], stat.st_mtime_ns, stat.st_size,
+                       header["checksum"], elapsed)
+    entry.artifact_bytes = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return entry
+
+
+def _current_checksum(path):
+    if is_artifact(path):
+        return read_header(path)["checksum"]
+    return file_checksum(path)
+
+
+def _load_pickle(path):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    checksum = hashlib.sha256(data).hexdigest()
+    model, feature_names = pickle.loads(data)
+    elapsed = time.perf_counter() - start
+    return ModelEntry(path, model, list(feature_names), stat.st_mtime_ns, stat.st_size, checksum, elapsed)
+
+
+class ModelRegistry:
+    def __init__(self, stat_interval=STAT_INTERVAL):
+        self.stat_interval = stat_interval
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._locks.setdefault(path, threading.Lock())
+
+    # Has the file on disk changed since the entry was loaded?
+    def _is_stale(self, entry):
+        now = time.monotonic()
+        if now - entry.checked_at < self.stat_interval:
+            return False
+        entry.checked_at = now
+        try:
+            stat = os.stat(entry.stat_path)
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                return False
+            # Touched but identical content (e.g. copied back) does not need a reload
+            checksum = _current_checksum(entry.path)
+        except FileNotFoundError:
+            # Keep serving the loaded copy while a new artifact is being written
+            return False
+        if checksum == entry.checksum:
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            return False
+        return True
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        entry = self._entries.get(path)
+        if entry is not None and not self._is_stale(entry):
+            return entry
+
+        with self._path_lock(path):
+            # Another session may have loaded it while we waited
+            current = self._entries.get(path)
+            if current is not None and current is not entry:
+                return current
+            new_entry = _load_artifact(path) if is_artifact(path) else _load_pickle(path)
+            if entry is not None:
+                self.reloads += 1
+            self._entries[path] = new_entry
+            return new_entry
+
+    def stats(self):
+        return [entry.stats() for entry in self._entries.values()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_registry = ModelRegistry()
+
+
+# Load (or reuse) a model artifact directory or `(model, feature_names)`
+# pickle for this process
+def get_model(path):
+    return _registry.get(path)
+
+
+# Prefer the memory-mapped `<name>.forest` artifact when it has been
+# converted, then a copy of `<name>.pkl` published to shared memory
+# (shared_models.py), otherwise fall back to `<name>.pkl`
+def find_model(name):
+    artifact_path = f"{name}.forest"
+    if is_artifact(artifact_path):
+        return artifact_path
+    return shared_model_path(name) or f"{name}.pkl"
+
+
+def registry_stats():
+    return _registry.stats()
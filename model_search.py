@@ -0,0 +1,197 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import KFold
+
+from dataset_store import is_dataset, read_manifest
+from forest_engine import compile_forest
+from model_artifact import save_artifact
+from training import MODELS, build_model, dataset_path, load_dataset, save_model, split_dataset
+
+# Parallel, resumable hyperparameter search for the supply models.
+#
+# The encoded feature matrices and CV fold indices are cached on disk under
+# CACHE_DIR, keyed by a hash of the dataset file, so repeated runs skip CSV
+# parsing and one-hot encoding. Each finished trial is appended to
+# trials_<folds>.jsonl straight away; an interrupted search picks up where it left
+# off and only runs the missing trials.
+
+CACHE_DIR = ".train_cache"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def trial_id(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# Encoded X/y and fold indices for a dataset, built once and reused
+def prepare_cache(name, data_path=None, n_folds=3):
+    config = MODELS[name]
+    data_path = data_path or dataset_path(name)
+    source_hash = read_manifest(data_path)["version"] if is_dataset(data_path) else _file_hash(data_path)
+    key = hashlib.sha256((source_hash + json.dumps(config["targets"])).encode()).hexdigest()[:16]
+    cache_path = os.path.join(CACHE_DIR, name, key)
+    os.makedirs(cache_path, exist_ok=True)
+
+    meta_path = os.path.join(cache_path, "features.json")
+    if not os.path.exists(meta_path):
+        X, y = load_dataset(name, data_path)
+        train_idx, test_idx = split_dataset(np.arange(len(X)), np.arange(len(X)))[:2]
+        np.save(os.path.join(cache_path, "X.npy"), X.to_numpy(dtype=np.float64))
+        np.save(os.path.join(cache_path, "y.npy"), y.to_numpy(dtype=np.float64))
+        np.savez(os.path.join(cache_path, "holdout.npz"), train=train_idx, test=test_idx)
+        with open(meta_path, "w") as f:
+            json.dump({"features": list(X.columns), "targets": list(y.columns), "source": data_path}, f)
+
+    folds_path = os.path.join(cache_path, f"folds_{n_folds}.npz")
+    if not os.path.exists(folds_path):
+        train_idx = np.load(os.path.join(cache_path, "holdout.npz"))["train"]
+        kfold = KFold(n_splits=n_folds, shuffle=True, random_state=42)
+        folds = {f"fold{i}": train_idx[val] for i, (_, val) in enumerate(kfold.split(train_idx))}
+        np.savez(folds_path, **folds)
+    return cache_path
+
+
+def load_cached(cache_path, n_folds):
+    X = np.load(os.path.join(cache_path, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(cache_path, "y.npy"), mmap_mode="r")
+    holdout = np.load(os.path.join(cache_path, "holdout.npz"))
+    folds = np.load(os.path.join(cache_path, f"folds_{n_folds}.npz"))
+    with open(os.path.join(cache_path, "features.json")) as f:
+        meta = json.load(f)
+    return X, y, holdout, [folds[f"fold{i}"] for i in range(n_folds)], meta
+
+
+def expand_grid(search_space):
+    keys = sorted(search_space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(search_space[k] for k in keys))]
+
+
+# Cross-validate one parameter set; runs in a worker process
+def run_trial(cache_path, n_folds, params):
+    X, y, holdout, folds, _ = load_cached(cache_path, n_folds)
+    train_idx = holdout["train"]
+    forest_params = {k: v for k, v in params.items() if k != "native_multioutput"}
+    forest_params.setdefault("random_state", 42)
+
+    scores = []
+    start = time.perf_counter()
+    for val_idx in folds:
+        fit_idx = np.setdiff1d(train_idx, val_idx)
+        model = build_model(forest_params, params.get("native_multioutput", False))
+        model.fit(X[fit_idx], y[fit_idx])
+        y_pred = model.predict(X[val_idx])
+        scores.append((r2_score(y[val_idx], y_pred), mean_absolute_error(y[val_idx], y_pred)))
+    r2s, maes = zip(*scores)
+    return {
+        "id": trial_id(params),
+        "params": params,
+        "cv_r2": float(np.mean(r2s)),
+        "cv_r2_std": float(np.std(r2s)),
+        "cv_mae": float(np.mean(maes)),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def load_trials(path):
+    trials = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    trial = json.loads(line)
+                    trials[trial["id"]] = trial
+    return trials
+
+
+def _append_trial(path, trial):
+    with open(path, "a") as f:
+        f.write(json.dumps(trial) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_search(name, output=None, artifact=None, n_folds=3, workers=None, max_trials=None,
+               data_path=None, log=print):
+    timings = {}
+    start = time.perf_counter()
+    cache_path = prepare_cache(name, data_path, n_folds)
+    timings["prepare_s"] = time.perf_counter() - start
+
+    # Fixed shuffle, so a larger --max-trials extends an earlier run's trials
+    grid = expand_grid(MODELS[name]["search_space"])
+    random.Random(42).shuffle(grid)
+    if max_trials is not None:
+        grid = grid[:max_trials]
+
+    trials_path = os.path.join(cache_path, f"trials_{n_folds}.jsonl")
+    done = load_trials(trials_path)
+    todo = [params for params in grid if trial_id(params) not in done]
+    log(f"{len(grid)} trials, {len(grid) - len(todo)} already done, running {len(todo)}")
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_trial, cache_path, n_folds, params) for params in todo]
+            for i, future in enumerate(as_completed(futures), 1):
+                trial = future.result()
+                _append_trial(trials_path, trial)
+                done[trial["id"]] = trial
+                log(f"[{i}/{len(todo)}] R² {trial['cv_r2']:.4f} MAE {trial['cv_mae']:.2f} "
+                    f"({trial['seconds']:.1f}s) {trial['params']}")
+    timings["search_s"] = time.perf_counter() - start
+
+    results = [done[trial_id(params)] for params in grid]
+    best = max(results, key=lambda trial: (trial["cv_r2"], -trial["cv_mae"]))
+
+    # Refit the best configuration on the full training split and score the holdout
+    start = time.perf_counter()
+    X, y, holdout, _, meta = load_cached(cache_path, n_folds)
+    params = dict(best["params"])
+    native = params.pop("native_multioutput", False)
+    params.setdefault("random_state", 42)
+    model = build_model(params, native)
+    # Fitted on a DataFrame so the saved model knows its feature names, like the
+    # ones from training.py; the page predicts with DataFrames
+    model.fit(pd.DataFrame(X[holdout["train"]], columns=meta["features"]), y[holdout["train"]])
+    timings["final_fit_s"] = time.perf_counter() - start
+    y_pred = model.predict(pd.DataFrame(X[holdout["test"]], columns=meta["features"]))
+
+    output = output or MODELS[name]["output"]
+    save_model(model, meta["features"], output)
+    if artifact:
+        save_artifact(compile_forest(model), meta["features"], artifact, meta["targets"],
+                      {"trained_with": "model_search", "params": best["params"], "source": meta["source"]})
+
+    report = {
+        "model": name,
+        "best_params": best["params"],
+        "cv_r2": best["cv_r2"],
+        "cv_mae": best["cv_mae"],
+        "holdout_r2": float(r2_score(y[holdout["test"]], y_pred)),
+        "holdout_mae": float(mean_absolute_error(y[holdout["test"]], y_pred)),
+        "trials": sorted(results, key=lambda trial: -trial["cv_r2"]),
+        "timings": {**timings, "trial_cpu_s": sum(trial["seconds"] for trial in results)},
+        "output": output,
+        "artifact": artifact,
+    }
+    with open(f"{os.path.splitext(output)[0]}_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    return report
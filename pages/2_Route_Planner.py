@@ -4,7 +4,11 @@ import urllib.parse
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
 import os
-from auth_system import check_auth
+from auth_system import check_auth, is_admin
+from gazetteer import FUZZY, get_gazetteer
+from maps_client import get_maps_client
+from geocode_cache import GeocodeError, format_coords, get_geocode_cache
+from place_autocomplete import AutocompleteError, autocomplete_stats, clear_autocomplete, suggest
 
 # Force authentication check before rendering anything
 is_authenticated = check_auth()
@@ -32,50 +36,103 @@ if not is_authenticated:
 # ---------------- LOAD ENV VARS ----------------
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+maps_client = get_maps_client(GOOGLE_API_KEY)
+
+# Wait for a whole route's locations (per-request timeouts are in maps_client)
+ROUTE_GEOCODE_TIMEOUT_SECONDS = 10
 
 # ---------------- Suggestion API ----------------
-def get_place_suggestions(input_text):
-    if not input_text:
-        return []
-    url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
+AUTOCOMPLETE_REGION = "country:in"
+
+def fetch_place_suggestions(input_text):
     params = {
         "input": input_text,
-        "key": GOOGLE_API_KEY,
         "types": "geocode",
-        "components": "country:in",
+        "components": AUTOCOMPLETE_REGION,
     }
-    response = requests.get(url, params=params)
-    predictions = response.json().get("predictions", [])
-    return [p["description"] for p in predictions]
+    data = maps_client.get("autocomplete", params)
+    # Only OK and ZERO_RESULTS are answers; anything else must not be cached
+    if data.get("status") not in ("OK", "ZERO_RESULTS"):
+        raise AutocompleteError(data.get("status", "unknown error"))
+    return [p["description"] for p in data.get("predictions", [])]
+
+# Suggestions from the offline gazetteer, or through the shared autocomplete
+# cache from Google when the gazetteer has only typo matches (which are still
+# offered when Google is unreachable). `field` remembers the last input per
+# text box, so reruns triggered by other widgets reuse it without a lookup;
+# a fallback after a failed Google lookup is not remembered, so the next
+# rerun tries Google again.
+def get_place_suggestions(input_text, field=None):
+    if not input_text:
+        return []
+    state_key = f"suggestions_{field}"
+    if field and st.session_state.get(state_key, (None,))[0] == input_text:
+        return st.session_state[state_key][1]
+    local = get_gazetteer().complete(input_text)
+    suggestions = [place.label for place, tier in local if tier < FUZZY]
+    failed = False
+    if not suggestions and GOOGLE_API_KEY:
+        try:
+            suggestions = suggest(input_text, AUTOCOMPLETE_REGION, fetch_place_suggestions)
+        except (requests.RequestException, AutocompleteError):
+            failed = True
+    suggestions = suggestions or [place.label for place, _ in local]
+    if field and not failed:
+        st.session_state[state_key] = (input_text, suggestions)
+    return suggestions
 
 # ---------------- Geocoding ----------------
-def geocode_address(address):
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-    params = {"address": address, "key": GOOGLE_API_KEY}
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        results = response.json().get("results")
-        if results:
-            location = results[0]["geometry"]["location"]
-            return f"{location['lat']},{location['lng']}"
-    return None
+# (lat, lng), or None when Google finds no such place; other failures raise
+# GeocodeError so they are not cached as "not found"
+def google_geocode(address):
+    try:
+        data = maps_client.get("geocode", {"address": address})
+    except requests.RequestException as e:
+        raise GeocodeError(str(e)) from e
+    if data.get("status") == "ZERO_RESULTS":
+        return None
+    if data.get("status") != "OK":
+        raise GeocodeError(data.get("status", "unknown error"))
+    location = data["results"][0]["geometry"]["location"]
+    return location["lat"], location["lng"]
+
+# Places named exactly as in the gazetteer are resolved locally; anything else
+# goes to Google
+def geocode_place(address):
+    place = get_gazetteer().geocode(address, fuzzy=False)
+    if place is None:
+        return google_geocode(address)
+    return place.lat, place.lng
+
+# Fill stops Google could not locate with a close gazetteer match ("Puro" ->
+# Puri). Done after the cache, so a guess is never stored as the place's
+# coordinates. Returns {address: label of the place used}.
+def approximate_stops(addresses, coords, failures):
+    places = {address: get_gazetteer().geocode(address) for address in failures}
+    approximate = {address: place.label for address, place in places.items() if place is not None}
+    for i, address in enumerate(addresses):
+        if address in approximate:
+            coords[i] = format_coords(places[address].lat, places[address].lng)
+    for address in approximate:
+        del failures[address]
+    return approximate
 
 # ---------------- Route Info ----------------
 def get_route_info(origin, destination, waypoints, mode):
-    url = "https://maps.googleapis.com/maps/api/directions/json"
     params = {
         "origin": origin,
         "destination": destination,
         "mode": mode,
-        "key": GOOGLE_API_KEY,
         "alternatives": "true"
     }
     if waypoints:
         params["waypoints"] = "|".join(waypoints)
 
-    response = requests.get(url, params=params)
-    data = response.json()
-    if data["status"] == "OK":
+    try:
+        data = maps_client.get("directions", params)
+    except requests.RequestException:
+        return None, None
+    if data.get("status") == "OK":
         leg = data["routes"][0]["legs"][0]
         return leg["distance"]["text"], leg["duration"]["text"]
     return None, None
@@ -92,12 +149,12 @@ with left:
 
     # SOURCE INPUT
     src_input = st.text_input("Start Location")
-    src_suggestions = get_place_suggestions(src_input)
+    src_suggestions = get_place_suggestions(src_input, field="src")
     src_selected = st.selectbox("Select Start Location", src_suggestions, key="src") if src_suggestions else src_input
 
     # DESTINATION INPUT
     dest_input = st.text_input("End Location")
-    dest_suggestions = get_place_suggestions(dest_input)
+    dest_suggestions = get_place_suggestions(dest_input, field="dest")
     dest_selected = st.selectbox("Select End Location", dest_suggestions, key="dest") if dest_suggestions else dest_input
 
     # VIA POINTS
@@ -112,12 +169,28 @@ with left:
 
 with right:
     if show and src_selected and dest_selected:
-        origin_coords = geocode_address(src_selected)
-        dest_coords = geocode_address(dest_selected)
-        waypoint_coords = [geocode_address(wp) for wp in via_points if wp]
+        # All stops are geocoded concurrently, in one round trip
+        stops = [src_selected, dest_selected] + via_points
+        with st.spinner("Locating stops..."):
+            coords, failures = get_geocode_cache().resolve_many(
+                stops, geocode_place, timeout=ROUTE_GEOCODE_TIMEOUT_SECONDS
+            )
+        approximate = approximate_stops(stops, coords, failures)
+        if approximate:
+            st.warning("⚠️ Approximate (offline) locations used: "
+                       + ", ".join(f"{address} → {label}" for address, label in approximate.items()))
+        origin_coords, dest_coords, *via_coords = coords
+        waypoint_coords = [c for c in via_coords if c]
+
+        unresolved = [f"{wp} ({failures[wp]})" for wp, c in zip(via_points, via_coords) if not c]
+        if unresolved:
+            st.warning("⚠️ Skipping via points that could not be located: " + ", ".join(unresolved))
 
         if not origin_coords or not dest_coords:
-            st.error("❌ Could not geocode start or destination location.")
+            unlocated = [f"{label} {place!r} ({failures[place]})"
+                         for label, place in (("start", src_selected), ("destination", dest_selected))
+                         if place in failures]
+            st.error("❌ Could not locate the " + " and the ".join(unlocated) + ".")
         else:
             # Optional: Get distance and time
             dist, time = get_route_info(origin_coords, dest_coords, waypoint_coords, mode)
@@ -143,3 +216,52 @@ with right:
                 """,
                 height=600,
             )
+
+# ---- ADMIN PANELS ----
+if is_admin():
+    with st.sidebar.expander("🗺️ Geocode Cache"):
+        geocode_cache = get_geocode_cache()
+        stats = geocode_cache.stats()
+        st.metric("Hit Rate", f"{stats['hit_rate']:.1%}")
+        st.caption(
+            f"{stats['hits']} hits · {stats['negative_hits']} not-found hits · {stats['misses']} misses · "
+            f"{stats['entries']} entries ({stats['negative_entries']} not found, {stats['pinned']} pinned) · "
+            f"{stats['expirations']} expired"
+        )
+        with st.form("pin_location", clear_on_submit=True):
+            pin_address = st.text_input("Address to pin")
+            pin_lat = st.number_input("Latitude", min_value=-90.0, max_value=90.0, format="%.6f")
+            pin_lng = st.number_input("Longitude", min_value=-180.0, max_value=180.0, format="%.6f")
+            if st.form_submit_button("📌 Pin Coordinates") and pin_address.strip():
+                geocode_cache.pin(pin_address.strip(), pin_lat, pin_lng)
+                st.success(f"Pinned {pin_address.strip()}")
+        for address, lat, lng in geocode_cache.pinned():
+            pin_col, unpin_col = st.columns([3, 1])
+            pin_col.caption(f"📌 {address} → {lat:.5f}, {lng:.5f}")
+            if unpin_col.button("Unpin", key=f"unpin_{address}"):
+                geocode_cache.unpin(address)
+                st.rerun()
+        if st.button("Clear Geocode Cache"):
+            geocode_cache.clear()
+            st.rerun()
+
+    with st.sidebar.expander("📡 Maps API"):
+        for endpoint, stats in maps_client.stats().items():
+            latency = (f"p50 {stats['p50_ms']:.0f} ms · p95 {stats['p95_ms']:.0f} ms"
+                       if stats["p50_ms"] is not None else "no calls yet")
+            st.caption(
+                f"**{endpoint}** · {stats['calls']} calls · {stats['retries']} retries · "
+                f"{stats['errors']} errors · {latency} · timeout {stats['timeout_seconds']}s"
+            )
+
+    with st.sidebar.expander("🔤 Place Autocomplete"):
+        stats = autocomplete_stats()
+        st.metric("Hit Rate", f"{stats['hit_rate']:.1%}")
+        st.caption(
+            f"{stats['hits']} hits · {stats['derived_hits']} answered from a shorter input · "
+            f"{stats['misses']} API calls · {stats['too_short']} too short to look up · "
+            f"{stats['entries']}/{stats['max_entries']} entries"
+        )
+        if st.button("Clear Autocomplete Cache"):
+            clear_autocomplete()
+            st.rerun()
@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Cached place autocomplete for the Route Planner.
+#
+# Suggestions are remembered per (normalized input, region) for all sessions
+# of a process. Google returns at most MAX_PREDICTIONS predictions, so a
+# shorter input that came back with fewer was a complete answer: suggestions
+# for any longer input starting with it are a subset of those, and are
+# filtered locally instead of fetched ("kolk" -> "kolkata"). Inputs shorter
+# than MIN_CHARS are never sent.
+#
+# Streamlit only reruns a text_input on Enter or blur, so there are no
+# keystrokes to debounce; the page instead skips the lookup entirely when a
+# field's text is unchanged since the last rerun.
+
+MIN_CHARS = 3
+MAX_PREDICTIONS = 5
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+# Raised by fetch functions for failed lookups (quota, denied, invalid), so
+# an error is never cached as a complete, empty answer
+class AutocompleteError(Exception):
+    pass
+
+
+def normalize_input(text):
+    return re.sub(r"\s+", " ", text.casefold()).strip()
+
+
+# Every word of the input starts some word of the suggestion (the last one
+# may still be half typed)
+def matches(suggestion, query):
+    suggestion_words = re.findall(r"\w+", suggestion.casefold())
+    return all(any(w.startswith(word) for w in suggestion_words) for word in re.findall(r"\w+", query))
+
+
+class AutocompleteCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS, min_chars=MIN_CHARS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_chars = min_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.derived_hits = 0
+        self.misses = 0
+        self.too_short = 0
+
+    def _get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        suggestions, complete, expires_at = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return suggestions, complete
+
+    # The longest cached complete answer for a prefix of `query`, filtered
+    def _derive(self, query, region):
+        for end in range(len(query) - 1, self.min_chars - 1, -1):
+            item = self._get((query[:end], region))
+            if item is not None and item[1]:
+                return [s for s in item[0] if matches(s, query)]
+        return None
+
+    def _put(self, key, suggestions):
+        self._entries[key] = (suggestions, len(suggestions) < MAX_PREDICTIONS, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # Suggestions for `text` in `region`; fetch_fn(text) -> list of place
+    # descriptions is only called when nothing cached can answer. Errors from
+    # fetch_fn (AutocompleteError, network errors) propagate uncached.
+    def suggest(self, text, region, fetch_fn):
+        query = normalize_input(text)
+        if len(query) < self.min_chars:
+            self.too_short += 1
+            return []
+        key = (query, region)
+        with self._lock:
+            item = self._get(key)
+            if item is not None:
+                self.hits += 1
+                return list(item[0])
+            derived = self._derive(query, region)
+            if derived is not None:
+                self.derived_hits += 1
+                self._put(key, derived)
+                return list(derived)
+            self.misses += 1
+        suggestions = list(fetch_fn(text))
+        with self._lock:
+            self._put(key, suggestions)
+        return list(suggestions)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.derived_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "derived_hits": self.derived_hits,
+            "misses": self.misses,
+            "too_short": self.too_short,
+            "hit_rate": (self.hits + self.derived_hits) / lookups if lookups else 0.0,
+        }
+
+
+_cache = AutocompleteCache()
+
+
+def suggest(text, region, fetch_fn):
+    return _cache.suggest(text, region, fetch_fn)
+
+
+def autocomplete_stats():
+    return _cache.stats()
+
+
+def clear_autocomplete():
+    _cache.clear()
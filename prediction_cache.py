@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Memoizes model predictions for repeated scenarios.
+#
+# Keys are the exact reindexed feature matrix plus the model version (a hash
+# of the artifact), so retraining a model makes its old entries unreachable
+# and they age out through normal LRU eviction.
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600
+
+
+class PredictionCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(version, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        return version, X.shape, X.tobytes()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        # Cached arrays are shared between sessions, so make them read-only
+        value = np.array(value)
+        value.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def predict(self, version, predict_fn, X):
+        key = self.make_key(version, X)
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, predict_fn(X))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+_cache = PredictionCache()
+
+
+# Predict through the shared cache, by default with a registry entry's
+# compiled forest. `variant` distinguishes different outputs of the same model
+# (e.g. interval quantiles).
+def cached_predict(entry, X, predict_fn=None, variant=None):
+    version = entry.version if variant is None else f"{entry.version}/{variant}"
+    return _cache.predict(version, predict_fn or entry.forest.predict, X)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+
+import numpy as np
+
+# In-process micro-batching prediction service.
+#
+# Each Streamlit session runs in its own script thread. Instead of every
+# session calling predict on its own single row, requests are queued and a
+# worker thread gathers everything that arrives within a short window into
+# one matrix, predicts it in a single vectorized call and resolves each
+# caller's future with its own rows.
+
+DEFAULT_WINDOW_MS = float(os.getenv("PREDICTION_BATCH_WINDOW_MS", "5"))
+DEFAULT_MAX_BATCH_ROWS = int(os.getenv("PREDICTION_MAX_BATCH_ROWS", "512"))
+DEFAULT_TIMEOUT_SECONDS = 30.0
+# Batchers kept per model and output kind; sessions still holding a model from
+# before a reload keep their version's batcher until it is the oldest of these
+MAX_VERSIONS_PER_MODEL = 2
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, window_ms=DEFAULT_WINDOW_MS, max_batch_rows=DEFAULT_MAX_BATCH_ROWS, name="batcher"):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self._queue = queue.Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        future = Future()
+        # Checked and queued together, so nothing can land behind close()'s sentinel
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("Prediction service is closed")
+            self._queue.put((X, future))
+        return future
+
+    def predict(self, X, timeout=DEFAULT_TIMEOUT_SECONDS):
+        return self.submit(X).result(timeout)
+
+    # Block for the first request, then keep collecting until the window
+    # closes or the batch is full
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        n_rows = len(first[0])
+        deadline = time.monotonic() + self.window
+        while n_rows < self.max_batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                self._fail_pending()
+                return
+            # Futures cancelled by a caller that gave up are dropped
+            batch = [(X, future) for X, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                predictions = np.asarray(self.predict_fn(np.vstack([X for X, _ in batch])))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(batch)
+            start = 0
+            for X, future in batch:
+                future.set_result(predictions[start:start + len(X)])
+                start += len(X)
+            self.rows += start
+
+    # Fail anything still queued after the sentinel instead of leaving it hanging
+    def _fail_pending(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(RuntimeError("Prediction service is closed"))
+
+    def close(self):
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "rows": self.rows,
+            "mean_batch_requests": self.requests / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+_batchers = {}
+_last_used = {}
+_lock = threading.Lock()
+
+
+# One batcher per model version and output kind (plain mean, or mean plus a
+# set of quantiles). A reloaded model gets its own batcher next to the old
+# one; beyond MAX_VERSIONS_PER_MODEL the least recently used version is closed.
+def get_batcher(entry, quantiles=None):
+    key = (entry.path, entry.version, quantiles)
+    with _lock:
+        _last_used[key] = time.monotonic()
+        batcher = _batchers.get(key)
+        if batcher is None:
+            if quantiles is None:
+                predict_fn = entry.forest.predict
+            else:
+                predict_fn = partial(entry.forest.predict_summary, quantiles=quantiles)
+            batcher = MicroBatcher(predict_fn, name=f"predict-{os.path.basename(entry.path)}")
+            _batchers[key] = batcher
+            versions = sorted((k for k in _batchers if k[0] == entry.path and k[2] == quantiles),
+                              key=_last_used.get)
+            for old_key in versions[:-MAX_VERSIONS_PER_MODEL]:
+                _batchers.pop(old_key).close()
+                del _last_used[old_key]
+        return batcher
+
+
+def batched_predict(entry, X, timeout=DEFAULT_TIMEOUT_SECONDS, quantiles=None):
+    try:
+        future = get_batcher(entry, quantiles).submit(X)
+    except RuntimeError:
+        # Closed by another session's reload between lookup and submit
+        future = get_batcher(entry, quantiles).submit(X)
+    return future.result(timeout)
+
+
+def service_stats():
+    with _lock:
+        return {key: batcher.stats() for key, batcher in _batchers.items()}
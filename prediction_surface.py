@@ -0,0 +1,219 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_prediction import DISASTER_TYPES, build_model_input
+
+# Precomputed prediction surfaces for instant slider feedback.
+#
+# A surface holds a model's output on a grid over the page inputs: every
+# severity and disaster type exactly, and a few points along each continuous
+# input. Lookups interpolate multilinearly between the surrounding grid
+# points, so the page can refresh estimates on every widget change without
+# touching the forests. Inputs outside the grid are clamped to its edges.
+
+SEVERITIES = [1, 2, 3, 4, 5]
+
+# Grid points along the continuous inputs each model depends on (denser where
+# the page defaults are); the other inputs are fixed at FIXED_INPUTS.
+# "Population Affected" is the sum of the three age groups, for models that
+# only see the total.
+#
+# The food/water forests split on area size all over its range and barely
+# trend with it, so linear interpolation needs a point every 100 sq km (and
+# every 1,250 people) to stay within MAX_LIVE_ERROR: ~1.2M points, 20 MB.
+# The supply model's six axes can't be made that dense; its estimate is
+# shown with its error band instead.
+AGE_GRID = [0, 200, 1000, 3000, 7000, 15000]
+MODEL_GRIDS = {
+    "food_water": {
+        "Area Size (sq km)": [10] + list(range(100, 5001, 100)),
+        "Duration (days)": list(range(1, 30)),
+        "Population Affected": list(range(0, 50001, 1250)) + [65000],
+    },
+    "supply": {
+        "Area Size (sq km)": [10, 500, 2000, 5000],
+        "Duration (days)": [1, 2, 4, 7, 10, 14, 21, 29],
+        "Age 0-12": AGE_GRID,
+        "Age 12-60": [0, 500, 3000, 10000, 20000, 35000],
+        "Age 60+": AGE_GRID,
+        "Gender Ratio": [0.8, 1.0, 1.25],
+    },
+}
+FIXED_INPUTS = {"Area Size (sq km)": 50.0, "Duration (days)": 7, "Gender Ratio": 1.0,
+                "Age 0-12": 100, "Age 12-60": 300, "Age 60+": 50}
+
+BUILD_CHUNK_ROWS = 50_000
+
+# Interpolation error is measured against each sampled prediction, with
+# predictions below REL_ERROR_FLOOR units treated as that size so near-zero
+# outputs compare in absolute terms. When 95% of samples are not within
+# MAX_LIVE_ERROR, the page shows the live estimate as a range.
+REL_ERROR_FLOOR = 1.0
+MAX_LIVE_ERROR = 0.05
+
+_loaded = {}
+
+
+class PredictionSurface:
+    def __init__(self, axes, grids, values, version, error=None):
+        self.axes = list(axes)
+        self.grids = [np.asarray(grid, dtype=np.float64) for grid in grids]
+        self.values = values      # (severity, disaster type, *grid points, n_outputs)
+        self.version = version    # version of the model the surface was built from
+        self.error = error or {}
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    # Interpolated model output for raw page-style inputs, shape (n_rows, n_outputs)
+    def lookup(self, scenario_df):
+        n = len(scenario_df)
+        severity = np.clip(scenario_df["Severity"].to_numpy(dtype=np.int64), 1, 5) - 1
+        types = scenario_df["Disaster Type"].astype(str).str.strip().str.title()
+        type_index = types.map({t: i for i, t in enumerate(DISASTER_TYPES)}).fillna(0).to_numpy(dtype=np.int64)
+
+        lower, frac = [], []
+        for axis, grid in zip(self.axes, self.grids):
+            x = _axis_values(scenario_df, axis)
+            i = np.clip(np.searchsorted(grid, x, side="right") - 1, 0, len(grid) - 2)
+            lower.append(i)
+            frac.append(np.clip((x - grid[i]) / (grid[i + 1] - grid[i]), 0.0, 1.0))
+
+        result = np.zeros((n, self.values.shape[-1]))
+        for corner in itertools.product((0, 1), repeat=len(self.axes)):
+            weight = np.ones(n)
+            index = [severity, type_index]
+            for d, upper in enumerate(corner):
+                weight *= frac[d] if upper else 1.0 - frac[d]
+                index.append(lower[d] + upper)
+            result += weight[:, None] * self.values[tuple(index)]
+        return result
+
+    def save(self, path):
+        meta = {"axes": self.axes, "version": self.version, "error": self.error}
+        np.savez_compressed(path, values=self.values, meta=np.array(json.dumps(meta)),
+                            **{f"grid_{i}": grid for i, grid in enumerate(self.grids)})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            grids = [data[f"grid_{i}"] for i in range(len(meta["axes"]))]
+            return cls(meta["axes"], grids, data["values"], meta["version"], meta["error"])
+
+
+def _axis_values(df, axis):
+    if axis == "Population Affected":
+        return df[["Age 0-12", "Age 12-60", "Age 60+"]].to_numpy(dtype=np.float64).sum(axis=1)
+    return df[axis].to_numpy(dtype=np.float64)
+
+
+# Raw inputs for every grid point (or sample) over `axes`
+def _scenario_frame(rows, axes):
+    grid_df = pd.DataFrame(rows, columns=["Severity", "Disaster Type"] + list(axes))
+    if "Population Affected" in grid_df.columns:
+        # Only the total matters to these models; put it all in one age group
+        grid_df["Age 0-12"], grid_df["Age 60+"] = 0, 0
+        grid_df["Age 12-60"] = grid_df.pop("Population Affected")
+    for column, value in FIXED_INPUTS.items():
+        if column not in grid_df.columns:
+            grid_df[column] = value
+    return grid_df
+
+
+# Predict `entry` (a model registry entry) on every point of {axis: grid points}
+def build_surface(entry, grids):
+    axes, grids = list(grids), list(grids.values())
+    grid_df = _scenario_frame(list(itertools.product(SEVERITIES, DISASTER_TYPES, *grids)), axes)
+
+    outputs = []
+    for start in range(0, len(grid_df), BUILD_CHUNK_ROWS):
+        chunk = build_model_input(grid_df.iloc[start:start + BUILD_CHUNK_ROWS])
+        outputs.append(np.asarray(entry.predict(chunk.reindex(columns=entry.feature_names, fill_value=0))))
+    values = np.concatenate(outputs).astype(np.float32)
+    shape = (len(SEVERITIES), len(DISASTER_TYPES)) + tuple(len(grid) for grid in grids) + (values.shape[1],)
+    return PredictionSurface(axes, grids, values.reshape(shape), entry.version)
+
+
+# Compare interpolated values with the real model on random in-grid scenarios
+def measure_error(surface, entry, n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = [rng.uniform(grid[0], grid[-1], n) for grid in surface.grids]
+    scenarios = _scenario_frame(zip(rng.integers(1, 6, n), rng.choice(DISASTER_TYPES, n), *samples), surface.axes)
+    scenarios["Duration (days)"] = np.round(scenarios["Duration (days)"])
+    for column in ("Age 0-12", "Age 12-60", "Age 60+"):
+        scenarios[column] = np.round(scenarios[column])
+
+    expected = np.asarray(entry.predict(build_model_input(scenarios).reindex(columns=entry.feature_names,
+                                                                             fill_value=0)))
+    actual = surface.lookup(scenarios)
+    abs_error = np.abs(actual - expected)
+    rel_error = abs_error / np.maximum(np.abs(expected), REL_ERROR_FLOOR)
+    return {
+        "samples": n,
+        "rel_floor": REL_ERROR_FLOOR,
+        "max_abs_error": abs_error.max(axis=0).tolist(),
+        "mean_abs_error": abs_error.mean(axis=0).tolist(),
+        "max_rel_error": float(rel_error.max()),
+        "p95_rel_error": float(np.percentile(rel_error, 95)),
+    }
+
+
+# p95 relative error of `surface`, or None for surfaces measured before
+# errors were per prediction
+def live_error(surface):
+    if "rel_floor" not in surface.error:
+        return None
+    return surface.error["p95_rel_error"]
+
+
+def surface_path(name):
+    return f"{name}_surface.npz"
+
+
+# The surface stored next to model `name`, or None if there is none or it was
+# built from a different version of the model than `entry`
+def find_surface(name, entry):
+    path = surface_path(name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _loaded.get(path, (None,))[0] != mtime:
+        _loaded[path] = (mtime, PredictionSurface.load(path))
+    surface = _loaded[path][1]
+    return surface if surface.version == entry.version else None
+
+
+if __name__ == "__main__":
+    from model_registry import find_model, get_model
+
+    parser = argparse.ArgumentParser(description="Precompute an interpolated prediction surface for a model")
+    parser.add_argument("model", choices=MODEL_GRIDS)
+    parser.add_argument("--model-path", help="Model pickle or artifact directory (defaults to the one the app loads)")
+    parser.add_argument("--output", help="Surface file to write (defaults to the one the app looks for)")
+    parser.add_argument("--error-samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    entry = get_model(args.model_path or find_model(f"{args.model}_model"))
+    args.output = args.output or surface_path(f"{args.model}_model")
+    start = time.perf_counter()
+    surface = build_surface(entry, MODEL_GRIDS[args.model])
+    build_seconds = time.perf_counter() - start
+    surface.error = measure_error(surface, entry, args.error_samples)
+    surface.save(args.output)
+
+    print(f"Built {surface.values[..., 0].size} grid points in {build_seconds:.1f}s "
+          f"({surface.nbytes / 1e6:.1f} MB)")
+    print(f"Max abs interpolation error per output: {[round(e, 2) for e in surface.error['max_abs_error']]}")
+    print(f"Relative error: max {surface.error['max_rel_error']:.1%}, p95 {surface.error['p95_rel_error']:.1%}")
+    if live_error(surface) > MAX_LIVE_ERROR:
+        print(f"p95 error is above {MAX_LIVE_ERROR:.0%}; the page will show live estimates from this surface "
+              f"as ±{live_error(surface):.0%} ranges")
@@ -0,0 +1,109 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from batch_prediction import (DISASTER_TYPES, FOOD_WATER_OUTPUTS, SUPPLY_OUTPUTS, quantile_label, read_chunks,
+                              write_chunks)
+
+# Daily replenishment schedules from predicted totals.
+#
+# Each zone's predicted total for an item is spread over its duration:
+# `front_load` of it is delivered on day 1 (the initial surge), and the rest
+# follows a daily series that decays by `decay` per day (exp(-decay * day)),
+# normalised so the days add back up to the predicted total. Weights for all
+# zones are computed as one zones x days matrix.
+
+ITEMS = FOOD_WATER_OUTPUTS + SUPPLY_OUTPUTS
+
+SCHEDULE_PROFILES = {
+    "Flood": {"front_load": 0.20, "decay": 0.08},
+    "Storm": {"front_load": 0.35, "decay": 0.20},       # short, sharp need right after landfall
+    "Earthquake": {"front_load": 0.30, "decay": 0.12},
+    "Drought": {"front_load": 0.05, "decay": 0.00},     # steady need for the whole duration
+}
+DEFAULT_PROFILE = {"front_load": 0.20, "decay": 0.05}
+
+
+def _profile_arrays(disaster_types, profiles):
+    profiles = {name.lower(): profile for name, profile in (profiles or SCHEDULE_PROFILES).items()}
+    keys = pd.Series(disaster_types).astype(str).str.strip().str.lower()
+    chosen = [profiles.get(key, DEFAULT_PROFILE) for key in keys]
+    front_load = np.array([profile["front_load"] for profile in chosen], dtype=np.float64)
+    decay = np.array([profile["decay"] for profile in chosen], dtype=np.float64)
+    return np.clip(front_load, 0.0, 1.0), np.maximum(decay, 0.0)
+
+
+# Share of each zone's total delivered on each day, shape (zones, max_days).
+# Rows sum to 1 over the zone's own duration and are 0 after it.
+def daily_weights(durations, disaster_types, profiles=None, max_days=None):
+    durations = np.maximum(np.asarray(durations, dtype=np.int64), 1)
+    max_days = max_days or int(durations.max(initial=1))
+    front_load, decay = _profile_arrays(disaster_types, profiles)
+
+    days = np.arange(max_days)
+    active = days[None, :] < durations[:, None]
+    curve = np.exp(-decay[:, None] * days[None, :]) * active
+    weights = curve * ((1.0 - front_load) / curve.sum(axis=1))[:, None]
+    weights[:, 0] += front_load
+    return weights
+
+
+# One row per zone and day with the day's quantity of every item. `results`
+# is batch prediction output (input columns plus predicted totals per item);
+# with `quantile` the schedule is built from that quantile's columns instead
+# of the mean, e.g. 0.9 to size deliveries on the upper bound. Zones are named
+# by `zone_column`, or by row number (read_chunks numbers rows across chunks).
+def build_schedule(results, items=ITEMS, profiles=None, start_date=None, quantile=None, zone_column="Zone"):
+    durations = np.maximum(results["Duration (days)"].to_numpy(dtype=np.int64), 1)
+    weights = daily_weights(durations, results["Disaster Type"], profiles)
+    zone_idx, day_idx = np.nonzero(np.arange(weights.shape[1])[None, :] < durations[:, None])
+
+    zones = results[zone_column] if zone_column in results.columns else pd.Series(results.index)
+    schedule = pd.DataFrame({
+        "Zone": zones.to_numpy()[zone_idx],
+        "Disaster Type": results["Disaster Type"].to_numpy()[zone_idx],
+        "Day": day_idx + 1,
+    })
+    if start_date is not None:
+        schedule["Date"] = pd.Timestamp(start_date) + pd.to_timedelta(day_idx, unit="D")
+
+    columns = [f"{item} {quantile_label(quantile)}" for item in items] if quantile else list(items)
+    missing = [col for col in columns if col not in results.columns]
+    if missing:
+        raise ValueError(f"Missing prediction columns: {', '.join(missing)}")
+    totals = results[columns].to_numpy(dtype=np.float64)
+    daily = totals[zone_idx] * weights[zone_idx, day_idx][:, None]
+    for i, item in enumerate(items):
+        schedule[item] = daily[:, i]
+    return schedule
+
+
+def schedule_chunks(result_chunks, items=ITEMS, profiles=None, start_date=None, quantile=None):
+    for chunk in result_chunks:
+        yield build_schedule(chunk, items, profiles, start_date, quantile)
+
+
+# "Flood=0.3,0.1" -> ("Flood", {"front_load": 0.3, "decay": 0.1})
+def parse_profile(text):
+    name, _, values = text.partition("=")
+    front_load, decay = (float(value) for value in values.split(","))
+    if name.strip().title() not in DISASTER_TYPES:
+        raise argparse.ArgumentTypeError(f"Unknown disaster type: {name}")
+    return name.strip().title(), {"front_load": front_load, "decay": decay}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Turn batch predictions into a day-by-day replenishment schedule")
+    parser.add_argument("predictions", help="Output of batch_prediction.py (.csv or .parquet)")
+    parser.add_argument("output", help="Where to write the schedule (.csv or .parquet)")
+    parser.add_argument("--start-date", help="Date of day 1 (adds a Date column)")
+    parser.add_argument("--quantile", type=float, help="Schedule this predicted quantile instead of the mean")
+    parser.add_argument("--profile", type=parse_profile, action="append", default=[],
+                        metavar="TYPE=FRONT_LOAD,DECAY", help="Override a disaster type's schedule profile")
+    args = parser.parse_args()
+
+    profiles = {**SCHEDULE_PROFILES, **dict(args.profile)}
+    chunks = read_chunks(args.predictions, args.predictions)
+    written = write_chunks(schedule_chunks(chunks, ITEMS, profiles, args.start_date, args.quantile), args.output)
+    print(f"Wrote {written} zone-days to {args.output}")
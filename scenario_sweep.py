@@ -0,0 +1,36 @@
+import itertools
+
+import pandas as pd
+
+from batch_prediction import DISASTER_TYPES, FOOD_WATER_OUTPUTS, SUPPLY_OUTPUTS, build_model_input, predict_frame
+
+# What-if sweep: every severity x duration x disaster type combination for
+# one scenario, predicted as a single feature matrix per model.
+
+SEVERITIES = [1, 2, 3, 4, 5]
+OUTPUTS = FOOD_WATER_OUTPUTS + SUPPLY_OUTPUTS
+
+
+# Cartesian grid around a base scenario (a dict of the page's input columns)
+def build_sweep_grid(base, max_duration):
+    combos = list(itertools.product(SEVERITIES, range(1, int(max_duration) + 1), DISASTER_TYPES))
+    grid = pd.DataFrame(combos, columns=["Severity", "Duration (days)", "Disaster Type"])
+    for column, value in base.items():
+        if column not in grid.columns:
+            grid[column] = value
+    return grid
+
+
+def run_sweep(base, max_duration, food_water_entry, supply_entry):
+    grid = build_sweep_grid(base, max_duration)
+    predictions = predict_frame(build_model_input(grid), food_water_entry, food_water_entry.feature_names,
+                                supply_entry, supply_entry.feature_names)
+    return pd.concat([grid[["Severity", "Duration (days)", "Disaster Type"]], predictions], axis=1)
+
+
+# Item totals by duration, one column per severity, for one disaster type
+def sweep_table(sweep_df, item, disaster_type):
+    subset = sweep_df[sweep_df["Disaster Type"] == disaster_type]
+    table = subset.pivot(index="Duration (days)", columns="Severity", values=item)
+    table.columns = [f"Severity {severity}" for severity in table.columns]
+    return table
@@ -0,0 +1,145 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from model_artifact import convert_pickle, is_artifact, read_header
+
+# Shared-memory hosting for the supply models.
+#
+# Publishing converts a model into the memory-mapped artifact format inside a
+# RAM-backed directory (/dev/shm, POSIX shared memory, when available). Every
+# server process that loads the published copy maps the same physical pages
+# read-only instead of unpickling its own private forest, so adding workers
+# adds almost no model memory. find_model() prefers a published copy as long
+# as it was built from the current local model file.
+#
+# Plain files in shared memory are used rather than
+# multiprocessing.shared_memory blocks: segments outlive any one worker,
+# readers need no handshake with the publisher, and Python's resource
+# tracker does not unlink them when an attached worker exits.
+
+SHARED_DIR = os.environ.get(
+    "MODEL_SHARED_DIR",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "disaster-supply-models"),
+)
+MODEL_NAMES = ["food_water_model", "supply_model"]
+
+
+def shared_path(name):
+    return os.path.join(SHARED_DIR, f"{name}.forest")
+
+
+def _source_stamp(source_path):
+    stat = os.stat(source_path)
+    return {"source_path": os.path.abspath(source_path), "source_mtime_ns": stat.st_mtime_ns,
+            "source_size": stat.st_size}
+
+
+# The published copy of `name`, or None if there is none or its source file
+# has changed since it was published
+def shared_model_path(name, source_path=None):
+    path = shared_path(name)
+    if not is_artifact(path):
+        return None
+    source_path = source_path or f"{name}.pkl"
+    try:
+        metadata = read_header(path)["metadata"]
+        stamp = _source_stamp(source_path)
+    except (OSError, ValueError):
+        return None
+    if any(metadata.get(key) != value for key, value in stamp.items()):
+        return None
+    return path
+
+
+# Convert `<name>.pkl` into the shared directory (no-op if already current)
+def publish_model(name, source_path=None):
+    source_path = source_path or f"{name}.pkl"
+    path = shared_model_path(name, source_path)
+    if path is not None:
+        return path, False
+    os.makedirs(SHARED_DIR, exist_ok=True)
+    convert_pickle(source_path, shared_path(name), metadata=_source_stamp(source_path))
+    return shared_path(name), True
+
+
+# ---- MEMORY REPORT ----
+# Resident memory of a process from /proc/<pid>/smaps_rollup, in MB. PSS
+# splits shared pages evenly between the processes mapping them, so summed
+# over workers it is the real footprint.
+def memory_usage(pid="self"):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "shared_mb": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+# One simulated server worker: load both models and predict a single row and
+# a batch (which touches most tree pages), then measure while every other
+# worker still has its models loaded
+def _worker(paths, barrier, results):
+    from benchmarks.scenarios import random_model_input
+    from forest_engine import _sklearn_tree
+    from model_registry import get_model
+
+    # The app imports scikit-learn anyway (training, drift monitor); load it
+    # first so the numbers only show what the models add
+    _sklearn_tree()
+    before = memory_usage()
+    for path in paths:
+        entry = get_model(path)
+        entry.predict(random_model_input(1, entry.feature_names, seed=0))
+        entry.predict(random_model_input(2000, entry.feature_names, seed=1))
+    barrier.wait()
+    results.put((os.getpid(), before, memory_usage()))
+    barrier.wait()
+
+
+def worker_report(paths, n_workers):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(paths, barrier, results)) for _ in range(n_workers)]
+    for worker in workers:
+        worker.start()
+    rows = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the supply models to shared memory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("publish", help=f"Publish the models into {SHARED_DIR}")
+    report_parser = subparsers.add_parser("report", help="Per-worker memory with private vs shared models")
+    report_parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    for name in MODEL_NAMES:
+        start = time.perf_counter()
+        path, published = publish_model(name)
+        status = f"published in {time.perf_counter() - start:.1f}s" if published else "already current"
+        print(f"{name}: {path} ({status})")
+
+    if args.command == "report":
+        for label, paths in (("private pickles", [f"{name}.pkl" for name in MODEL_NAMES]),
+                             ("shared artifacts", [shared_path(name) for name in MODEL_NAMES])):
+            print(f"\n{args.workers} workers, {label}:")
+            total_pss = 0.0
+            for pid, before, after in worker_report(paths, args.workers):
+                total_pss += after["pss_mb"]
+                print(f"  pid {pid:>7}  RSS {before['rss_mb']:7.1f} -> {after['rss_mb']:7.1f} MB  "
+                      f"PSS {after['pss_mb']:7.1f} MB  shared {after['shared_mb']:7.1f} MB  "
+                      f"private {after['private_mb']:7.1f} MB")
+            print(f"  total PSS {total_pss:.1f} MB")
@@ -0,0 +1,183 @@
+import argparse
+import io
+import pickle
+import time
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.multioutput import MultiOutputRegressor
+
+from dataset_store import is_dataset, load_frame
+from forest_engine import compile_forest
+
+# ---- MODEL CONFIGURATION ----
+# Same datasets, targets and hyperparameters as the training notebook
+MODELS = {
+    "food_water": {
+        "data": "data/synthetic_food_water_data (2).csv",
+        # Columnar copy of the data, used instead of the CSV once converted
+        "store": "data/food_water.dataset",
+        "targets": ["Rice Supply (kg)", "Vegetables Supply (kg)", "Dry Food Supply (kg)", "Water Supply (liters)"],
+        "params": {"n_estimators": 200, "max_depth": 11, "min_samples_split": 4, "min_samples_leaf": 1,
+                   "max_features": "sqrt", "random_state": 42},
+        "output": "food_water_model.pkl",
+        # Grid explored by `python training.py search`
+        "search_space": {"n_estimators": [100, 200, 400], "max_depth": [11, 20, None],
+                         "min_samples_split": [2, 4], "max_features": ["sqrt", 0.8],
+                         "native_multioutput": [False, True]},
+    },
+    "supply": {
+        "data": "data/synthetic_medicine_clothing_data (2).csv",
+        "store": "data/supply.dataset",
+        "targets": ["Baby Food (kg)", "Elder Medicine (units)", "Sanitary Items (units)", "Clothing Supply (sets)"],
+        "params": {"n_estimators": 750, "max_depth": 45, "min_samples_split": 3, "min_samples_leaf": 1,
+                   "max_features": 0.8, "random_state": 42},
+        "output": "supply_model.pkl",
+        "search_space": {"n_estimators": [200, 400, 750], "max_depth": [20, 45, None],
+                         "min_samples_split": [2, 3], "max_features": [0.5, 0.8, 1.0],
+                         "native_multioutput": [False, True]},
+    },
+}
+
+
+# The columnar store when it has been converted, otherwise the CSV
+def dataset_path(name):
+    config = MODELS[name]
+    return config["store"] if is_dataset(config["store"]) else config["data"]
+
+
+def load_dataset(name, path=None):
+    config = MODELS[name]
+    df = load_frame(path or dataset_path(name))
+    # One-hot encode disaster type
+    df = pd.get_dummies(df, columns=["Disaster Type"], drop_first=True)
+    X = df.drop(columns=config["targets"])
+    y = df[config["targets"]]
+    return X, y
+
+
+def split_dataset(X, y):
+    return train_test_split(X, y, test_size=0.2, random_state=42, shuffle=True)
+
+
+# One forest per target (MultiOutputRegressor, the notebook layout) or a
+# single forest predicting all targets at once
+def build_model(params, native_multioutput=False):
+    forest = RandomForestRegressor(**params)
+    return forest if native_multioutput else MultiOutputRegressor(forest)
+
+
+def evaluate(model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    return {
+        "mae": mean_absolute_error(y_test, y_pred),
+        "r2": r2_score(y_test, y_pred),
+        "r2_per_target": dict(zip(y_test.columns, r2_score(y_test, y_pred, multioutput="raw_values"))),
+    }
+
+
+def save_model(model, feature_names, path):
+    with open(path, "wb") as file:
+        pickle.dump((model, feature_names), file)
+
+
+def train_model(name, native_multioutput=False, output=None, params=None):
+    config = MODELS[name]
+    X, y = load_dataset(name)
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+
+    model = build_model(params or config["params"], native_multioutput)
+    model.fit(X_train, y_train)
+    metrics = evaluate(model, X_test, y_test)
+
+    print(f"Mean Absolute Error (MAE): {metrics['mae']:.2f}")
+    print(f"R-Squared (R²): {metrics['r2']:.2f}")
+
+    save_model(model, X.columns, output or config["output"])
+    print(f"Model saved to {output or config['output']}")
+    return model, metrics
+
+
+def _best_time(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+# Train both layouts on the same split and report accuracy, size and latency
+def compare_layouts(name):
+    config = MODELS[name]
+    X, y = load_dataset(name)
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+    one_row = X_test.iloc[:1]
+
+    rows = []
+    for native in (False, True):
+        model = build_model(config["params"], native)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+
+        metrics = evaluate(model, X_test, y_test)
+        buffer = io.BytesIO()
+        pickle.dump((model, X.columns), buffer)
+        forest = compile_forest(model)
+
+        rows.append({
+            "layout": "native multi-output" if native else "MultiOutputRegressor",
+            "mae": metrics["mae"],
+            "r2": metrics["r2"],
+            **{f"r2 {target}": score for target, score in metrics["r2_per_target"].items()},
+            "trees": forest.n_trees,
+            "nodes": forest.n_nodes,
+            "pickle_mb": buffer.tell() / (1024 * 1024),
+            "fit_s": fit_seconds,
+            "sklearn_1_row_ms": _best_time(lambda: model.predict(one_row)) * 1e3,
+            "engine_1_row_ms": _best_time(lambda: forest.predict(one_row)) * 1e3,
+            "sklearn_test_set_ms": _best_time(lambda: model.predict(X_test)) * 1e3,
+        })
+    return pd.DataFrame(rows).set_index("layout").T
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the disaster supply prediction models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train a model and save it as a pickle")
+    train_parser.add_argument("model", choices=MODELS)
+    train_parser.add_argument("--native-multioutput", action="store_true",
+                              help="Fit one forest for all targets instead of one per target")
+    train_parser.add_argument("--output", help="Pickle path (defaults to the path the app loads)")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare per-target and native multi-output forests")
+    compare_parser.add_argument("model", choices=MODELS)
+
+    search_parser = subparsers.add_parser("search", help="Parallel, resumable hyperparameter search")
+    search_parser.add_argument("model", choices=MODELS)
+    search_parser.add_argument("--data", help="Dataset CSV (defaults to the bundled one)")
+    search_parser.add_argument("--output", help="Pickle path (defaults to the path the app loads)")
+    search_parser.add_argument("--artifact", help="Also write a memory-mapped artifact directory")
+    search_parser.add_argument("--folds", type=int, default=3)
+    search_parser.add_argument("--workers", type=int, help="Worker processes (defaults to all cores)")
+    search_parser.add_argument("--max-trials", type=int, help="Sample this many configurations from the grid")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train_model(args.model, args.native_multioutput, args.output)
+    elif args.command == "search":
+        from model_search import run_search
+
+        report = run_search(args.model, args.output, args.artifact, args.folds, args.workers,
+                            args.max_trials, args.data)
+        print(f"Best: {report['best_params']}")
+        print(f"CV R² {report['cv_r2']:.4f} · holdout R² {report['holdout_r2']:.4f} · "
+              f"holdout MAE {report['holdout_mae']:.2f}")
+        print(f"Timings: {', '.join(f'{k} {v:.1f}' for k, v in report['timings'].items())}")
+    else:
+        with pd.option_context("display.float_format", "{:.4f}".format, "display.width", 120):
+            print(compare_layouts(args.model))